@@ -0,0 +1,186 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from src.consts import VEHICLES
+from src.image_process.board_image import BoardImage, BoardNotFoundError
+
+SAMPLES_PATH = os.path.join(os.path.dirname(__file__), os.pardir, "samples")
+GROUND_TRUTH_PATH = os.path.join(os.path.dirname(__file__), "samples.json")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+STAGES = ("cvtColor", "find_board_corners", "perspective_transform", "find_board_orientation", "find_vehicles")
+
+# Pipeline configurations, each one is a set of BoardImage.from_frame keyword arguments
+CONFIGURATIONS = {
+    "default": {},
+    "pyramid": {"pyramid": True},
+    "single-pass": {"single_pass": True},
+    "pyramid-single-pass": {"pyramid": True, "single_pass": True},
+}
+DEFAULT_CONFIGURATIONS = tuple(CONFIGURATIONS)
+
+
+def process(image: np.ndarray, options: dict) -> BoardImage:
+    board_image = BoardImage.from_frame(image, **options)
+    board_image.process(VEHICLES)
+    return board_image
+
+
+def run_sample(image_path: str, expected: Optional[np.ndarray], options: dict, repeat: int,
+               measure_memory: bool) -> dict:
+    # Decoding the photo is not part of the pipeline, it is read once outside the timed runs
+    image = cv2.imread(image_path)
+    times = []
+    stage_times = {stage: [] for stage in STAGES}
+    board_matrix = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        try:
+            board_image = process(image, options)
+        except (BoardNotFoundError, cv2.error):
+            # The board was not found, the failure counts as a wrong detection
+            board_image = None
+        times.append(time.perf_counter() - start_time)
+        if board_image is not None:
+            board_matrix = board_image.board_matrix
+            for stage in STAGES:
+                stage_times[stage].append(board_image.stage_times.get(stage, 0.0))
+
+    peak_memory = None
+    if measure_memory:
+        tracemalloc.start()
+        try:
+            process(image, options)
+        except (BoardNotFoundError, cv2.error):
+            pass
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    cell_accuracy = None
+    correct = None
+    if expected is not None:
+        cell_accuracy = float(np.mean(board_matrix == expected)) if board_matrix is not None else 0.0
+        correct = cell_accuracy == 1.0
+    return {
+        "sample": os.path.basename(image_path),
+        "time": statistics.median(times),
+        "min_time": min(times),
+        "stage_times": {stage: statistics.median(values) if values else None
+                        for stage, values in stage_times.items()},
+        "peak_memory": peak_memory,
+        "board": board_matrix.tolist() if board_matrix is not None else None,
+        "cell_accuracy": cell_accuracy,
+        "correct": correct
+    }
+
+
+def summarize(results: list[dict]) -> dict:
+    labelled = [result for result in results if result["correct"] is not None]
+    return {
+        "samples": len(results),
+        "labelled": len(labelled),
+        "correct": sum(result["correct"] for result in labelled),
+        "cell_accuracy": statistics.mean(result["cell_accuracy"] for result in labelled) if labelled else None,
+        "total_time": sum(result["time"] for result in results),
+        "stage_times": {stage: sum(result["stage_times"][stage] or 0.0 for result in results) for stage in STAGES},
+        "peak_memory": max((result["peak_memory"] or 0 for result in results), default=None)
+    }
+
+
+def compare(results: list[dict], baseline: dict, threshold: float) -> list[dict]:
+    baseline_results = {(result["configuration"], result["sample"]): result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        baseline_result = baseline_results.get((result["configuration"], result["sample"]))
+        if not baseline_result:
+            continue
+        if baseline_result["time"]:
+            result["baseline_ratio"] = result["time"] / baseline_result["time"]
+        if result.get("baseline_ratio", 0) > threshold or \
+                (baseline_result["correct"] and result["correct"] is False):
+            regressions.append(result)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the board image pipeline over a directory of photos")
+    parser.add_argument("--samples", default=SAMPLES_PATH, help="directory of board photos")
+    parser.add_argument("--ground-truth", default=GROUND_TRUTH_PATH,
+                        help="JSON object from photo file name to its board matrix")
+    parser.add_argument("--configurations", nargs="+", choices=list(CONFIGURATIONS), default=DEFAULT_CONFIGURATIONS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="skip the extra tracemalloc run per photo")
+    parser.add_argument("-o", "--output", default="-", help="JSON results file, - for stdout")
+    parser.add_argument("--baseline", help="results file of a previous run to compare against")
+    parser.add_argument("--threshold", type=float, default=1.1,
+                        help="time ratio against the baseline that counts as a regression")
+    args = parser.parse_args()
+
+    ground_truth = {}
+    if os.path.exists(args.ground_truth):
+        with open(args.ground_truth, encoding="utf-8") as file:
+            ground_truth = json.load(file)
+    samples = sorted((name for name in os.listdir(args.samples) if name.lower().endswith(IMAGE_EXTENSIONS)),
+                     key=lambda name: (len(name), name))
+
+    results = []
+    summaries = {}
+    for configuration in args.configurations:
+        configuration_results = []
+        for sample in samples:
+            expected = np.array(ground_truth[sample]) if sample in ground_truth else None
+            result = run_sample(os.path.join(args.samples, sample), expected, CONFIGURATIONS[configuration],
+                                args.repeat, not args.no_memory)
+            result["configuration"] = configuration
+            configuration_results.append(result)
+            status = "unlabelled" if result["correct"] is None else "ok" if result["correct"] else \
+                f"WRONG ({result['cell_accuracy']:.0%} of cells)"
+            print(f"{configuration:20} {sample:12} {result['time'] * 1000:10.1f} ms {status}", file=sys.stderr)
+        summaries[configuration] = summarize(configuration_results)
+        results.extend(configuration_results)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        for regression in regressions:
+            reason = "detection is no longer correct" if regression["correct"] is False else \
+                f"{regression['baseline_ratio']:.2f}x the baseline time"
+            print(f"Regression: {regression['configuration']} {regression['sample']} {reason}", file=sys.stderr)
+
+    report = {
+        "metadata": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "opencv": cv2.__version__,
+            "repeat": args.repeat,
+            # Peak resident set size of the whole run, it includes OpenCV buffers that tracemalloc does not see
+            "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        },
+        "summaries": summaries,
+        "results": results
+    }
+    if args.output == "-":
+        print(json.dumps(report, indent=2))
+    else:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+    if regressions or any(result["correct"] is False for result in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from src.models.board import Board, SolverEngine, SearchAlgorithm, SearchStore, MoveMetric
+from src.solver.heuristics import zero_heuristic
+from src.solver.stats import SolveStats
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "puzzles.json")
+
+# Solver configurations, each one is a set of Board.solve keyword arguments
+CONFIGURATIONS = {
+    "board-bfs": {"engine": SolverEngine.BOARD},
+    "bitboard-bfs": {"engine": SolverEngine.BITBOARD},
+    "bitboard-compact": {"engine": SolverEngine.BITBOARD, "store": SearchStore.COMPACT},
+    "bitboard-a-star": {"engine": SolverEngine.BITBOARD, "algorithm": SearchAlgorithm.A_STAR},
+    # A* without a heuristic expands the states of BFS, the baseline of what the blocking heuristic saves
+    "bitboard-a-star-zero": {"engine": SolverEngine.BITBOARD, "algorithm": SearchAlgorithm.A_STAR,
+                             "heuristic": zero_heuristic},
+    "bitboard-vectorized": {"engine": SolverEngine.BITBOARD, "vectorized": True},
+    # Scaling of the parallel BFS with the worker count, compare against bitboard-bfs on a multi-core machine
+    "bitboard-parallel-2": {"engine": SolverEngine.BITBOARD, "workers": 2},
+    "bitboard-parallel-4": {"engine": SolverEngine.BITBOARD, "workers": 4},
+    "bitboard-parallel-8": {"engine": SolverEngine.BITBOARD, "workers": 8},
+    "slide-bfs": {"engine": SolverEngine.BITBOARD, "metric": MoveMetric.SLIDE},
+    "slide-a-star": {"engine": SolverEngine.BITBOARD, "metric": MoveMetric.SLIDE,
+                     "algorithm": SearchAlgorithm.A_STAR},
+}
+DEFAULT_CONFIGURATIONS = ("bitboard-bfs", "bitboard-compact", "bitboard-a-star", "bitboard-vectorized",
+                          "slide-bfs", "slide-a-star")
+
+
+def supports_stats(options: dict) -> bool:
+    return options.get("engine") == SolverEngine.BITBOARD and not options.get("vectorized") \
+        and options.get("workers", 1) == 1
+
+
+def run_puzzle(puzzle: dict, options: dict, repeat: int, measure_memory: bool) -> dict:
+    board = Board.decode(puzzle["board"])
+    expected = puzzle["slide_moves"] if options.get("metric") == MoveMetric.SLIDE else puzzle["steps"]
+    times = []
+    stats = None
+    node = None
+    for _ in range(repeat):
+        stats = SolveStats() if supports_stats(options) else None
+        extra_options = {"stats": stats} if stats is not None else {}
+        start_time = time.perf_counter()
+        node = board.solve(**options, **extra_options)
+        times.append(time.perf_counter() - start_time)
+
+    peak_memory = None
+    if measure_memory:
+        tracemalloc.start()
+        board.solve(**options)
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    median_time = statistics.median(times)
+    nodes_expanded = stats.nodes_expanded if stats else None
+    solution_length = node.depth if node else None
+    return {
+        "puzzle": puzzle["name"],
+        "group": puzzle["group"],
+        "time": median_time,
+        "min_time": min(times),
+        "peak_memory": peak_memory,
+        "nodes_expanded": nodes_expanded,
+        "states_per_second": nodes_expanded / median_time if nodes_expanded and median_time else None,
+        "solution_length": solution_length,
+        "correct": solution_length == expected
+    }
+
+
+def compare(results: list[dict], baseline: dict, threshold: float) -> list[dict]:
+    baseline_times = {(result["configuration"], result["puzzle"]): result["time"] for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        baseline_time = baseline_times.get((result["configuration"], result["puzzle"]))
+        if baseline_time:
+            result["baseline_ratio"] = result["time"] / baseline_time
+            if result["baseline_ratio"] > threshold:
+                regressions.append(result)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Rush Hour solvers over a puzzle corpus")
+    parser.add_argument("--corpus", default=CORPUS_PATH)
+    parser.add_argument("--configurations", nargs="+", choices=list(CONFIGURATIONS), default=DEFAULT_CONFIGURATIONS)
+    parser.add_argument("--groups", nargs="+", help="only run puzzles of these difficulty groups")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="skip the extra tracemalloc run per puzzle")
+    parser.add_argument("-o", "--output", default="-", help="JSON results file, - for stdout")
+    parser.add_argument("--baseline", help="results file of a previous run to compare against")
+    parser.add_argument("--threshold", type=float, default=1.1,
+                        help="time ratio against the baseline that counts as a regression")
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8") as file:
+        puzzles = json.load(file)
+    if args.groups:
+        puzzles = [puzzle for puzzle in puzzles if puzzle["group"] in args.groups]
+
+    results = []
+    for configuration in args.configurations:
+        for puzzle in puzzles:
+            result = run_puzzle(puzzle, CONFIGURATIONS[configuration], args.repeat, not args.no_memory)
+            result["configuration"] = configuration
+            results.append(result)
+            print(f"{configuration:20} {puzzle['name']:12} {result['time'] * 1000:10.1f} ms "
+                  f"{'ok' if result['correct'] else 'WRONG LENGTH'}", file=sys.stderr)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression['configuration']} {regression['puzzle']} is "
+                  f"{regression['baseline_ratio']:.2f}x the baseline time", file=sys.stderr)
+
+    report = {
+        "metadata": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat
+        },
+        "results": results
+    }
+    if args.output == "-":
+        print(json.dumps(report, indent=2))
+    else:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+    if regressions or not all(result["correct"] for result in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
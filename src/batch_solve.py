@@ -0,0 +1,172 @@
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from collections.abc import Callable, Iterable, Iterator
+from itertools import chain, islice
+from typing import Optional, TextIO, Union
+
+import numpy as np
+
+from src.models.board import Board, SolverEngine, SearchAlgorithm, MoveMetric, BOARD_SIZE
+from src.solver.stats import SolveStats
+
+# A board matrix, or the Board.encode() string of the board
+BoardInput = Union[np.ndarray, list[list[int]], str]
+
+
+def read_matrix_boards(lines: Iterator[str]) -> Iterator[tuple[None, list[list[int]]]]:
+    """
+    Boards as BOARD_SIZE lines of whitespace separated vehicle ids, lines starting with # are ignored
+    """
+    rows = []
+    for line in lines:
+        line = line.strip()
+        if line.startswith("#"):
+            continue
+        if line:
+            rows.append([int(cell) for cell in line.split()])
+        if len(rows) == BOARD_SIZE:
+            yield None, rows
+            rows = []
+    if rows:
+        raise ValueError(f"Incomplete board with {len(rows)} rows at the end of the input")
+
+
+def read_jsonl_boards(lines: Iterator[str]) -> Iterator[tuple[Optional[object], BoardInput]]:
+    """
+    One JSON object per line, with a "board" that is either a matrix or a Board.encode() string and an optional "id".
+    Boards are checked by solve_board, so an invalid board only fails its own result.
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        yield record.get("id"), record["board"]
+
+
+def read_boards(file: TextIO, input_format: str) -> Iterator[tuple[object, BoardInput]]:
+    """
+    @return: the id and board of every board in the file, boards without an id get their index in the file
+    """
+    lines = iter(file)
+    if input_format == "auto":
+        first_line = next(lines, "")
+        input_format = "jsonl" if first_line.lstrip().startswith("{") else "matrix"
+        lines = chain([first_line], lines)
+    reader = read_jsonl_boards if input_format == "jsonl" else read_matrix_boards
+    for index, (board_id, board) in enumerate(reader(lines)):
+        yield board_id if board_id is not None else index, board
+
+
+def solve_board(task: tuple[object, BoardInput, dict]) -> dict:
+    """
+    @return: the result of the board, or its id and error message if the board is invalid or solving it failed
+    """
+    board_id, board, options = task
+    stats = SolveStats()
+    start_time = time.perf_counter()
+    try:
+        board = Board.decode(board) if isinstance(board, str) else Board.from_matrix(board)
+        solution = board.find_solution(engine=SolverEngine.BITBOARD, stats=stats, **options)
+    except Exception as error:
+        # Reported in the board's own result, so the rest of the stream is still solved
+        return {"id": board_id, "error": str(error)}
+    wall_time = time.perf_counter() - start_time
+    return {
+        "id": board_id,
+        "solved": solution is not None,
+        "solution_length": len(solution) if solution is not None else None,
+        "moves": list(solution.moves) if solution is not None else None,
+        "nodes_expanded": stats.nodes_expanded,
+        "wall_time": wall_time
+    }
+
+
+def map_chunk(function: Callable, chunk: list) -> list:
+    return [function(task) for task in chunk]
+
+
+def bounded_map(executor: Executor, function: Callable, tasks: Iterable, window: int, chunk_size=1) -> Iterator:
+    """
+    executor.map that streams: tasks are submitted by a background thread at most window chunks ahead of the
+    results, so results come out while the input is still being read and memory does not grow with the input
+    @param window: maximum number of chunks submitted and not yet returned
+    @return: the results in the order of the tasks
+    """
+    futures = queue.Queue(maxsize=window)
+
+    def submit_tasks():
+        task_iterator = iter(tasks)
+        try:
+            while chunk := list(islice(task_iterator, chunk_size)):
+                futures.put(executor.submit(map_chunk, function, chunk))
+        except Exception as error:
+            futures.put(error)
+        futures.put(None)
+
+    threading.Thread(target=submit_tasks, daemon=True).start()
+    while (future := futures.get()) is not None:
+        if isinstance(future, Exception):
+            # Reading the input failed, raise it in the caller after the results before it
+            raise future
+        yield from future.result()
+
+
+def batch_solve(boards: Iterator[tuple[object, BoardInput]], output: TextIO, options: dict,
+                workers: Optional[int] = None, chunk_size=1) -> dict:
+    start_time = time.perf_counter()
+    count = solved = errors = 0
+    tasks = ((board_id, board, options) for board_id, board in boards)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for result in bounded_map(executor, solve_board, tasks, 2 * (workers or os.cpu_count()), chunk_size):
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+            count += 1
+            solved += result.get("solved", False)
+            errors += "error" in result
+    wall_time = time.perf_counter() - start_time
+    return {
+        "boards": count,
+        "solved": solved,
+        "errors": errors,
+        "wall_time": wall_time,
+        "boards_per_second": count / wall_time if wall_time else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve many Rush Hour boards and stream the results as JSONL")
+    parser.add_argument("input", nargs="?", default="-", help="board file, - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="JSONL output file, - for stdout")
+    parser.add_argument("--format", choices=("auto", "matrix", "jsonl"), default="auto")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--max-depth", type=int, default=93)
+    parser.add_argument("--metric", choices=[metric.name.lower() for metric in MoveMetric], default="step")
+    parser.add_argument("--algorithm", choices=[algorithm.name.lower() for algorithm in SearchAlgorithm],
+                        default="bfs")
+    args = parser.parse_args()
+
+    options = {
+        "max_depth": args.max_depth,
+        "metric": MoveMetric[args.metric.upper()],
+        "algorithm": SearchAlgorithm[args.algorithm.upper()]
+    }
+    input_file = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    output_file = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        summary = batch_solve(read_boards(input_file, args.format), output_file, options, args.workers)
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+    print(json.dumps(summary), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
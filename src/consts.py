@@ -1,8 +1,19 @@
 from src.image_process.image_vehicle import VehicleImage
 
 
+SOLUTION_CACHE_PATH = "solutions.cache"
+IMAGE_CACHE_PATH = "image_cache"
+# The image cache evicts the least recently used results beyond this many bytes
+IMAGE_CACHE_MAX_BYTES = 16 * 1024 * 1024
+# A stream finds the board again when its color mask overlaps the previous one by less than this IoU
+STREAM_BOARD_MOVED_THRESHOLD = 0.9
+DAEMON_SOCKET_PATH = "rush_hour.sock"
+DAEMON_SOLUTION_CACHE_PATH = "daemon_solutions.cache"
 CELL_SIZE = 75
 MARGIN = CELL_SIZE // 8
+ANIMATION_FPS = 60
+# Seconds the autoplay takes to slide a vehicle by one cell
+ANIMATION_CELL_TIME = 0.15
 VEHICLE_COLORS = {
                   1: '#D62133', #Red
                   2: '#F0F167', #Light Yellow Car
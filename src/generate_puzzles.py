@@ -0,0 +1,81 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from collections.abc import Iterator
+from itertools import islice
+from typing import Optional, TextIO
+
+from src.batch_solve import bounded_map
+from src.models.board import Board, MoveMetric
+from src.solver.retrograde import Piece, enumerate_layouts, sample_layouts, pieces_layout, hardest_puzzles
+
+
+def generate_layout_puzzles(task: tuple[tuple[Piece, ...], bool, int]) -> list[dict]:
+    pieces, slide, min_moves = task
+    layout = pieces_layout(pieces)
+    records = []
+    for puzzle in hardest_puzzles(layout, slide, min_moves):
+        board = Board(layout.to_vehicles(puzzle.state))
+        records.append({
+            "id": board.encode(),
+            "board": board.to_matrix().tolist(),
+            "solution_length": puzzle.solution_length,
+            "metric": "slide" if slide else "step",
+            "component_size": puzzle.component_size
+        })
+    return records
+
+
+def generate_puzzles(layouts: Iterator[tuple[Piece, ...]], output: TextIO, slide=False, min_moves=1,
+                     workers: Optional[int] = None, chunk_size=16) -> dict:
+    """
+    Writes the hardest puzzle of every component of every layout as JSONL, in the format batch_solve reads
+    """
+    start_time = time.perf_counter()
+    layout_count = count = 0
+    tasks = ((pieces, slide, min_moves) for pieces in layouts)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for records in bounded_map(executor, generate_layout_puzzles, tasks,
+                                   2 * (workers or os.cpu_count()), chunk_size):
+            for record in records:
+                output.write(json.dumps(record) + "\n")
+            output.flush()
+            layout_count += 1
+            count += len(records)
+    wall_time = time.perf_counter() - start_time
+    return {
+        "layouts": layout_count,
+        "puzzles": count,
+        "wall_time": wall_time,
+        "layouts_per_second": layout_count / wall_time if wall_time else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate Rush Hour puzzles with known optimal solution lengths")
+    parser.add_argument("-o", "--output", default="-", help="JSONL output file, - for stdout")
+    parser.add_argument("--vehicles", type=int, default=10, help="number of vehicles including the red car")
+    parser.add_argument("--layouts", type=int, default=1000, help="number of vehicle layouts to search")
+    parser.add_argument("--seed", type=int, help="sample random layouts instead of enumerating them in order")
+    parser.add_argument("--min-moves", type=int, default=10)
+    parser.add_argument("--metric", choices=[metric.name.lower() for metric in MoveMetric], default="step")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    layouts = enumerate_layouts(args.vehicles) if args.seed is None else sample_layouts(args.vehicles, args.seed)
+    slide = MoveMetric[args.metric.upper()] == MoveMetric.SLIDE
+    output_file = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        summary = generate_puzzles(islice(layouts, args.layouts), output_file, slide, args.min_moves,
+                                   args.workers)
+    finally:
+        if output_file is not sys.stdout:
+            output_file.close()
+    print(json.dumps(summary), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
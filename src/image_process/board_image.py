@@ -1,12 +1,19 @@
 import cv2
 import math
+import time
 import numpy as np
 from enum import Enum
 from itertools import product
-from src.image_process.image_vehicle import VehicleImage
+from typing import Optional
+from src.image_process.image_vehicle import VehicleImage, find_vehicles_single_pass
+from src.image_process.placement import solve_placements
 from src.image_process.consts import *
 
 
+class BoardNotFoundError(Exception):
+    pass
+
+
 class BoardOrientation(Enum):
     DOWN = 0
     RIGHT = 1
@@ -21,23 +28,108 @@ class VehicleOrientation(Enum):
 
 class BoardImage:
     image: np.ndarray
+    detection_image: np.ndarray
+    detection_scale: float
+    image_scale: float
+    single_pass: bool
+    board_corners: np.ndarray
     board_orientation: BoardOrientation
     board_matrix: np.ndarray
+    stage_times: dict[str, float]
 
-    def __init__(self, image_path: str):
-        self.image = cv2.cvtColor(cv2.imread(image_path), cv2.COLOR_BGR2HSV)
+    def __init__(self, image_path: str, pyramid=False, single_pass=False):
+        """
+        @param pyramid: also keep a copy downscaled to PYRAMID_DETECTION_SIZE, the board is then found on the copy
+        and the vehicles on a board warped to PYRAMID_BOARD_SIZE
+        @param single_pass: label all vehicle colors with one lookup table pass instead of a pass per vehicle
+        """
+        self.load(cv2.imread(image_path), pyramid, single_pass)
+
+    @staticmethod
+    def from_frame(frame: np.ndarray, pyramid=False, single_pass=False) -> "BoardImage":
+        """
+        @param frame: BGR image, for example a video frame
+        """
+        board_image = BoardImage.__new__(BoardImage)
+        board_image.load(frame, pyramid, single_pass)
+        return board_image
+
+    def load(self, image: np.ndarray, pyramid: bool, single_pass: bool):
+        # Seconds spent in every stage of the pipeline, for benchmarks
+        self.stage_times = {}
+        start_time = time.perf_counter()
+        self.image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+        self.detection_image = self.image
+        self.detection_scale = 1.0
+        # Pixel sized parameters were tuned on photos of REFERENCE_IMAGE_SIZE, the pyramid mode scales them
+        self.image_scale = max(image.shape[0:2]) / REFERENCE_IMAGE_SIZE
+        if pyramid and max(image.shape[0:2]) > PYRAMID_DETECTION_SIZE:
+            self.detection_scale = PYRAMID_DETECTION_SIZE / max(image.shape[0:2])
+            small_image = cv2.resize(image, None, fx=self.detection_scale, fy=self.detection_scale,
+                                     interpolation=cv2.INTER_AREA)
+            self.detection_image = cv2.cvtColor(small_image, cv2.COLOR_BGR2HSV)
+        self.stage_times["cvtColor"] = time.perf_counter() - start_time
+        self.single_pass = single_pass
+        self.board_corners = None
         self.board_orientation = BoardOrientation.DOWN
         self.board_matrix = np.zeros((6, 6), dtype=int)
 
-    def process(self, vehicles: list[VehicleImage]):
-        board_corners = BoardImage.find_board_corners(self.image)
-        self.image = BoardImage.perspective_transform(self.image, board_corners)
-        self.board_orientation = BoardImage.find_board_orientation(self.image)
+    def process(self, vehicles: list[VehicleImage], board_corners: np.ndarray = None,
+                board_orientation: BoardOrientation = None):
+        """
+        @param board_corners: corners found on an earlier image of the same board, skips finding them again
+        @param board_orientation: orientation found on an earlier image of the same board
+        """
+        start_time = time.perf_counter()
+        self.board_corners = self.find_corners() if board_corners is None else board_corners
+        self.stage_times["find_board_corners"] = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        self.image = BoardImage.perspective_transform(self.image, self.board_corners)
+        scale = 1.0
+        if self.detection_scale < 1:
+            # Vehicles are found on a board of fixed size, the morphology kernels shrink with it
+            board_scale = min(1.0, PYRAMID_BOARD_SIZE / max(self.image.shape[0:2]))
+            self.image = cv2.resize(self.image, None, fx=board_scale, fy=board_scale, interpolation=cv2.INTER_AREA)
+            scale = board_scale * self.image_scale
+        self.stage_times["perspective_transform"] = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        if board_orientation is None:
+            board_orientation = BoardImage.find_board_orientation(self.image, scale)
+        self.board_orientation = board_orientation
+        self.stage_times["find_board_orientation"] = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
         self.image = BoardImage.remove_board_edges(self.image, self.board_orientation)
-        self.find_vehicles(vehicles)
+        self.find_vehicles(vehicles, scale=scale)
         self.board_matrix = np.rot90(self.board_matrix, k=self.board_orientation.value)
+        self.stage_times["find_vehicles"] = time.perf_counter() - start_time
         return self.board_matrix
 
+    def find_corners(self) -> np.ndarray:
+        if self.detection_scale == 1:
+            return BoardImage.find_board_corners(self.image)
+        try:
+            board_corners = BoardImage.find_board_corners(self.detection_image,
+                                                          self.detection_scale * self.image_scale)
+        except BoardNotFoundError:
+            board_corners = None
+        if board_corners is not None:
+            board_corners = board_corners / self.detection_scale
+        if board_corners is None or not BoardImage.is_board_quadrilateral(board_corners, self.image.shape):
+            # The downscaled copy lost the board, fall back to the full resolution corners
+            board_corners = BoardImage.find_board_corners(self.image)
+        return board_corners
+
+    @staticmethod
+    def is_board_quadrilateral(corners: np.ndarray, image_shape: tuple) -> bool:
+        m, n = image_shape[0:2]
+        if len(corners) != 4:
+            return False
+        contour = BoardImage.sort_points_clockwise(corners)
+        return cv2.isContourConvex(contour) and cv2.contourArea(contour) >= PYRAMID_MIN_BOARD_AREA * m * n
+
     @staticmethod
     def sort_points_clockwise(points: np.ndarray) -> np.ndarray:
         # Calculate the centroid of the points
@@ -121,7 +213,10 @@ class BoardImage:
         Ai = np.linalg.inv(A)
 
         # calculate the real aspect ratio, stage 20
-        ar_real = math.sqrt(np.dot(np.dot(np.dot(n2, Ati), Ai), n2) / np.dot(np.dot(np.dot(n3, Ati), Ai), n3))
+        ar_squared = np.dot(np.dot(np.dot(n2, Ati), Ai), n2) / np.dot(np.dot(np.dot(n3, Ati), Ai), n3)
+        if not np.isfinite(ar_squared) or ar_squared <= 0:
+            raise BoardNotFoundError("The board corners do not form a quadrilateral")
+        ar_real = math.sqrt(ar_squared)
 
         # Rectification section 3.3
         if ar_real < ar_vis:
@@ -137,57 +232,43 @@ class BoardImage:
         return cv2.warpPerspective(image, M, (W, H))
 
     @staticmethod
-    def find_board_corners(image: np.ndarray) -> np.ndarray:
+    def scale_kernel(dimensions: tuple[int, int], scale: float) -> tuple[int, int]:
+        return tuple(max(3, round(dimension * scale) | 1) for dimension in dimensions)
+
+    @staticmethod
+    def find_board_corners(image: np.ndarray, scale=1.0) -> np.ndarray:
+        """
+        @param scale: size of the image relative to a full resolution photo, pixel sized parameters are scaled by it
+        """
         m, n = image.shape[0:2]
         mask = cv2.inRange(image, *BOARD_COLOR_RANGE)
         ret, threshold = cv2.threshold(mask, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
 
         edges = cv2.Canny(threshold, CORNERS_CANNY_THRESHOLD1, CORNERS_CANNY_THRESHOLD2)
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, CORNERS_MORPH_RECT_DIMENSIONS)
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, BoardImage.scale_kernel(CORNERS_MORPH_RECT_DIMENSIONS, scale))
         edges = cv2.dilate(edges, kernel, iterations=CORNERS_MORPH_ITERATIONS)
         # Hough lines
         lines_image = edges.copy()
         lines = cv2.HoughLinesP(
             edges,  # Input edge image
-            2,  # Distance resolution in pixels
+            CORNERS_HOUGH_RHO,  # Distance resolution in pixels
             np.pi / 180,  # Angle resolution in radians
-            threshold=300,  # Min number of votes for valid line
+            threshold=max(1, round(CORNERS_HOUGH_THRESHOLD * scale)),  # Min number of votes for valid line
             minLineLength=max(m, n) * CORNERS_LINES_MIN_LENGTH,
             maxLineGap=max(m, n) * CORNERS_LINES_MAX_GAP
         )
-        # Iterate over points
-        epsilon = 0.000001
-        for line1_index, line1 in enumerate(lines):
-            # Extracted points nested in the list
-            line1_x1, line1_y1, line1_x2, line1_y2 = line1[0]
-            m1 = (line1_y2 - line1_y1) / (line1_x2 - line1_x1) if np.abs(line1_x2 - line1_x1) > epsilon else np.inf
-            for line2 in lines[line1_index + 1:]:
-                # Extracted points nested in the list
-                line2_x1, line2_y1, line2_x2, line2_y2 = line2[0]
-                m2 = (line2_y2 - line2_y1) / (line2_x2 - line2_x1) if np.abs(line2_x2 - line2_x1) > epsilon else np.inf
-                if np.abs(m1) < epsilon or np.abs(m2) < epsilon:
-                    if np.abs(m1) < epsilon and np.abs(m2) < epsilon:
-                        dist = np.abs(line1_y1 - line2_y1)
-                    else:
-                        continue
-                elif m1 == np.inf and m2 == np.inf:
-                    dist = np.abs(line1_x1 - line2_x1)
-                elif np.abs(m1 - m2) <= CORNERS_LINES_SLOPE_THRESHOLD and (m2 + 1 / m1) != 0:
-                    x_cross = (line1_y1 + line1_x1 / m1 - line2_y1 + m2 * line2_x1) / (m2 + 1 / m1)
-                    y_cross = line2_y1 + m2 * (x_cross - line2_x1)
-                    dist = np.sqrt((line1_x1 - x_cross) ** 2 + (line1_y1 - y_cross) ** 2)
-                else:
-                    continue
-                if dist > CORNERS_LINES_DISTANCE_THRESHOLD * m:
-                    # Draw the lines joing the points
-                    # On the original image
-                    cv2.line(lines_image, (line1_x1, line1_y1), (line1_x2, line1_y2), (255, 255, 255), 1)
-                    cv2.line(lines_image, (line2_x1, line2_y1), (line2_x2, line2_y2), (255, 255, 255), 1)
+        if lines is None:
+            raise BoardNotFoundError("No board edges in the image")
+        # Draw every line that has a parallel partner far enough away, in a single batch
+        kept_lines = lines[BoardImage.find_parallel_lines(lines.reshape(-1, 4), m), 0]
+        cv2.polylines(lines_image, kept_lines.reshape(-1, 2, 2), False, (255, 255, 255), 1)
 
         closing = cv2.morphologyEx(lines_image, cv2.MORPH_CLOSE, kernel, iterations=CORNERS_MORPH_ITERATIONS)
         contours = cv2.findContours(closing, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         contours = contours[0] if len(contours) == 2 else contours[1]
-        contour = sorted(contours, key=cv2.contourArea, reverse=True)[0]
+        if not contours:
+            raise BoardNotFoundError("No board outline in the image")
+        contour = max(contours, key=cv2.contourArea)
 
         length = cv2.arcLength(contour, True)
         approx = cv2.approxPolyDP(contour, CORNERS_APPROX_POLY_DP * length, True)
@@ -197,41 +278,82 @@ class BoardImage:
         # Black image same size as original input
         hullImg = np.zeros((m, n), dtype=np.uint8)
         # Draw the points:
-        cv2.drawContours(hullImg, [hull], 0, 255, 5)
+        cv2.drawContours(hullImg, [hull], 0, 255, max(1, round(CORNERS_HULL_THICKNESS * scale)))
         maxCorners = 4
-        qualityLevel = 0.01
+        qualityLevel = CORNERS_QUALITY_LEVEL
         minDistance = int(max(m, n) / maxCorners)
         # Get the corners:
         corners = cv2.goodFeaturesToTrack(hullImg, maxCorners, qualityLevel, minDistance)
+        if corners is None or len(corners) < 4:
+            raise BoardNotFoundError("No board corners in the image")
         corners = np.intp(corners)
         return corners.sum(axis=1)
 
     @staticmethod
-    def find_board_orientation(image: np.ndarray) -> BoardOrientation:
-        logo_color_lower = (90, 10, 120)
-        logo_color_upper = (110, 50, 210)
+    def find_parallel_lines(lines: np.ndarray, m: int) -> np.ndarray:
+        """
+        Compares all pairs of lines at once: horizontal and vertical pairs by their offset, other pairs with
+        slopes closer than CORNERS_LINES_SLOPE_THRESHOLD by the distance from the first line's start point to
+        the perpendicular that crosses the second line
+        @param lines: (x1, y1, x2, y2) rows
+        @param m: height of the image
+        @return: mask of the lines that belong to a pair further apart than CORNERS_LINES_DISTANCE_THRESHOLD * m
+        """
+        epsilon = 0.000001
+        x1, y1, x2, y2 = lines.T
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slopes = np.where(np.abs(x2 - x1) > epsilon, (y2 - y1) / (x2 - x1), np.inf)
+        first, second = np.triu_indices(len(lines), 1)
+        m1, m2 = slopes[first], slopes[second]
+
+        flat1, flat2 = np.abs(m1) < epsilon, np.abs(m2) < epsilon
+        both_flat = flat1 & flat2
+        both_steep = ~flat1 & ~flat2 & (m1 == np.inf) & (m2 == np.inf)
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            inverse_m1 = 1 / m1
+            crossing = ~flat1 & ~flat2 & ~both_steep \
+                & (np.abs(m1 - m2) <= CORNERS_LINES_SLOPE_THRESHOLD) & (m2 + inverse_m1 != 0)
+            x_cross = (y1[first] + x1[first] / m1 - y1[second] + m2 * x1[second]) / (m2 + inverse_m1)
+            y_cross = y1[second] + m2 * (x_cross - x1[second])
+            cross_distance = np.sqrt((x1[first] - x_cross) ** 2 + (y1[first] - y_cross) ** 2)
+
+        distance = np.select(
+            [both_flat, both_steep, crossing],
+            [np.abs(y1[first] - y1[second]), np.abs(x1[first] - x1[second]), cross_distance],
+            default=-np.inf
+        )
+        kept_pairs = distance > CORNERS_LINES_DISTANCE_THRESHOLD * m
+        kept = np.zeros(len(lines), dtype=bool)
+        kept[first[kept_pairs]] = True
+        kept[second[kept_pairs]] = True
+        return kept
 
+    @staticmethod
+    def find_board_orientation(image: np.ndarray, scale=1.0) -> BoardOrientation:
         m, n = image.shape[0:2]
-        logo_area_threshold = ((m / 6) * 0.6) * ((n / 6) * 0.6)
+        logo_area_threshold = ((m / 6) * MIN_CELL_FRACTION) * ((n / 6) * MIN_CELL_FRACTION)
 
         # Find border
-        mask = cv2.inRange(image, (30, 0, 20), (120, 120, 120))
+        mask = cv2.inRange(image, *BOARD_COLOR_RANGE)
         ret, threshold = cv2.threshold(mask, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
 
-        horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (9, 5))
-        vertical_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 9))
-        dilate = cv2.dilate(threshold, horizontal_kernel, iterations=2)
-        dilate = cv2.dilate(dilate, vertical_kernel, iterations=3)
-        closing = cv2.morphologyEx(dilate, cv2.MORPH_CLOSE, horizontal_kernel, iterations=12)
-        closing = cv2.morphologyEx(closing, cv2.MORPH_CLOSE, vertical_kernel, iterations=12)
+        horizontal_kernel = cv2.getStructuringElement(
+            cv2.MORPH_RECT, BoardImage.scale_kernel(ORIENTATION_HORIZONTAL_RECT_DIMENSIONS, scale))
+        vertical_kernel = cv2.getStructuringElement(
+            cv2.MORPH_RECT, BoardImage.scale_kernel(ORIENTATION_VERTICAL_RECT_DIMENSIONS, scale))
+        horizontal_iterations, vertical_iterations = ORIENTATION_DILATE_ITERATIONS
+        dilate = cv2.dilate(threshold, horizontal_kernel, iterations=horizontal_iterations)
+        dilate = cv2.dilate(dilate, vertical_kernel, iterations=vertical_iterations)
+        closing = cv2.morphologyEx(dilate, cv2.MORPH_CLOSE, horizontal_kernel, iterations=ORIENTATION_CLOSE_ITERATIONS)
+        closing = cv2.morphologyEx(closing, cv2.MORPH_CLOSE, vertical_kernel, iterations=ORIENTATION_CLOSE_ITERATIONS)
         masked_closing_color = cv2.bitwise_and(image, image, mask=closing)
 
         # Logo search
-        mask_logo = cv2.inRange(masked_closing_color, logo_color_lower, logo_color_upper)
+        mask_logo = cv2.inRange(masked_closing_color, *LOGO_COLOR_RANGE)
         ret, threshold = cv2.threshold(mask_logo, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
-        dilate_logo = cv2.dilate(threshold, kernel, iterations=5)
-        closing_logo = cv2.morphologyEx(dilate_logo, cv2.MORPH_CLOSE, kernel, iterations=5)
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, BoardImage.scale_kernel(LOGO_MORPH_RECT_DIMENSIONS, scale))
+        dilate_logo = cv2.dilate(threshold, kernel, iterations=LOGO_MORPH_ITERATIONS)
+        closing_logo = cv2.morphologyEx(dilate_logo, cv2.MORPH_CLOSE, kernel, iterations=LOGO_MORPH_ITERATIONS)
 
         contours = cv2.findContours(closing_logo, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         if contours[0]:
@@ -239,14 +361,14 @@ class BoardImage:
             contours = sorted(contours, key=cv2.contourArea, reverse=True)
             for contour in contours:
                 (x, y, w, h) = cv2.boundingRect(contour)
-                if w * h > logo_area_threshold and max(w, h) / min(w, h) < 3:
-                    if h >= m * 0.9:
+                if w * h > logo_area_threshold and max(w, h) / min(w, h) < LOGO_MAX_ASPECT_RATIO:
+                    if h >= m * (1 - LOGO_EDGE_MARGIN):
                         return BoardOrientation.DOWN
-                    elif y <= m * 0.1:
+                    elif y <= m * LOGO_EDGE_MARGIN:
                         return BoardOrientation.UP
-                    elif x <= n * 0.1:
+                    elif x <= n * LOGO_EDGE_MARGIN:
                         return BoardOrientation.RIGHT
-                    elif x + w >= n * 0.9:
+                    elif x + w >= n * (1 - LOGO_EDGE_MARGIN):
                         return BoardOrientation.LEFT
                     else:
                         continue
@@ -257,14 +379,8 @@ class BoardImage:
     @staticmethod
     def remove_board_edges(image: np.ndarray, orientation: BoardOrientation) -> np.ndarray:
         m, n = image.shape[0:2]
-        if orientation == BoardOrientation.DOWN:
-            return image[round(m * 0.08):round(-m * 0.14), round(n * 0.06):round(-n * 0.06)]
-        elif orientation == BoardOrientation.RIGHT:
-            return image[round(m * 0.06):round(-m * 0.06), round(n * 0.14):round(-n * 0.08)]
-        elif orientation == BoardOrientation.UP:
-            return image[round(m * 0.14):round(-m * 0.09), round(n * 0.06):round(-n * 0.06)]
-        elif orientation == BoardOrientation.LEFT:
-            return image[round(m * 0.06):round(-m * 0.06), round(n * 0.08):round(-n * 0.14)]
+        top, bottom, left, right = BOARD_EDGE_MARGINS[orientation.name]
+        return image[round(m * top):round(-m * bottom), round(n * left):round(-n * right)]
 
     def add_vehicle_to_board(self, vehicle, row, col, vehicle_orientation):
         if vehicle_orientation == VehicleOrientation.HORIZONTAL:
@@ -288,7 +404,21 @@ class BoardImage:
                 return not self.board_matrix[row - vehicle.size + 1:row + 1, col:col + 1].any()
         return False
 
-    def find_vehicles(self, vehicles, orientation_ratio_threshold=1.2, location_threshold=0.35):
+    def placement_mask(self, vehicle, row, col, vehicle_orientation) -> Optional[int]:
+        """
+        @return: bitmask of the slots the vehicle covers at this location, bit row * 6 + col, None if off the board
+        """
+        if not self.is_in_range(vehicle, row, col, vehicle_orientation):
+            return None
+        if vehicle_orientation == VehicleOrientation.HORIZONTAL:
+            return sum(1 << (row * 6 + col + offset) for offset in range(vehicle.size))
+        return sum(1 << ((row - offset) * 6 + col) for offset in range(vehicle.size))
+
+    def placement_mask_of_board(self) -> int:
+        return sum(1 << index for index, vehicle_id in enumerate(self.board_matrix.flat) if vehicle_id)
+
+    def find_vehicles(self, vehicles, orientation_ratio_threshold=VEHICLE_ORIENTATION_RATIO_THRESHOLD,
+                      location_threshold=VEHICLE_LOCATION_THRESHOLD, scale=1.0):
 
         self.board_matrix = np.zeros((6, 6), dtype=int)
         m, n = self.image.shape[0:2]
@@ -314,7 +444,7 @@ class BoardImage:
 
             return updated_optional_locations
 
-        def filter_by_edges(vehicles_to_process, vehicles_to_optional_locations, threshold=0.03):
+        def filter_by_edges(vehicles_to_process, vehicles_to_optional_locations, threshold=VEHICLE_EDGE_THRESHOLD):
             new_vehicle_to_optional_locations = {}
             for vehicle, optional_locations in vehicles_to_optional_locations.items():
                 (x, y, w, h) = vehicles_to_process[vehicle]
@@ -362,8 +492,14 @@ class BoardImage:
         vehicle_process_row_location = {}
         vehicle_process_orientation = {}
 
+        contour_area_threshold = ((m / 6) * MIN_CELL_FRACTION) * ((n / 6) * MIN_CELL_FRACTION)
+        if self.single_pass:
+            vehicle_locations = find_vehicles_single_pass(tuple(vehicles), self.image, contour_area_threshold, scale)
         for vehicle in vehicles:
-            vehicle_location = vehicle.find_vehicle(self.image, ((m/6)*0.6) * ((n/6)*0.6))
+            if self.single_pass:
+                vehicle_location = vehicle_locations.get(vehicle.id)
+            else:
+                vehicle_location = vehicle.find_vehicle(self.image, contour_area_threshold, scale)
             if not vehicle_location:
                 continue
             (x, y, w, h) = vehicle_location
@@ -451,23 +587,16 @@ class BoardImage:
         if vehicles[0] in vehicles_to_optional_locations:
             vehicles_to_optional_locations[vehicles[0]] = filter_by_red_car(vehicles_to_optional_locations[vehicles[0]])
         vehicles_to_optional_locations = filter_by_conflicts(vehicles_to_optional_locations)
-        vehicles_to_optional_locations = filter_by_edges(vehicles_to_process, vehicles_to_optional_locations, 0.03)
-
-        vehicles_to_optional_locations = dict(sorted(vehicles_to_optional_locations.items(), key=lambda key: len(key)))
-        for option in product(*vehicles_to_optional_locations.values()):
-            is_legal = True
-            backup_matrix = self.board_matrix.copy()
-            for index, vehicle in enumerate(vehicles_to_optional_locations.keys()):
-                row, col, vehicle_orientation = option[index]
-                if self.is_available(vehicle, row, col, vehicle_orientation):
-                    self.add_vehicle_to_board(vehicle, row, col, vehicle_orientation)
-                else:
-                    is_legal = False
-                    self.board_matrix = backup_matrix
-                    break
-            if is_legal:
-                vehicles_to_optional_locations = {}
-                break
+        vehicles_to_optional_locations = filter_by_edges(vehicles_to_process, vehicles_to_optional_locations)
+
+        placements = solve_placements(
+            [[self.placement_mask(vehicle, *optional_location) for optional_location in optional_locations]
+             for vehicle, optional_locations in vehicles_to_optional_locations.items()],
+            self.placement_mask_of_board(), PLACEMENT_TIME_LIMIT)
+        if placements is not None:
+            for (vehicle, optional_locations), placement in zip(vehicles_to_optional_locations.items(), placements):
+                self.add_vehicle_to_board(vehicle, *optional_locations[placement])
+            vehicles_to_optional_locations = {}
 
         while len(vehicles_to_optional_locations) != 0:
             vehicle = next(iter(vehicles_to_optional_locations))
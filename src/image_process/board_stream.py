@@ -0,0 +1,104 @@
+import argparse
+import cv2
+import numpy as np
+from collections.abc import Iterator
+from typing import Optional, Union
+from src.consts import VEHICLES, STREAM_BOARD_MOVED_THRESHOLD
+from src.models.board import Board, SolverEngine, MoveMetric
+from src.image_process.board_image import BoardImage, BoardOrientation, BoardNotFoundError
+from src.image_process.image_vehicle import VehicleImage
+from src.image_process.consts import *
+
+
+class BoardStream:
+    """
+    Reads boards from a stream of frames of the same physical board. The corners and orientation of the board
+    are only found again when the board moved, steady frames only run the vehicle detection.
+    """
+    vehicles: list[VehicleImage]
+    pyramid: bool
+    single_pass: bool
+    moved_threshold: float
+    board_corners: Optional[np.ndarray]
+    board_orientation: Optional[BoardOrientation]
+    board_mask: Optional[np.ndarray]
+    board_matrix: Optional[np.ndarray]
+
+    def __init__(self, vehicles: list[VehicleImage], pyramid=True, single_pass=True,
+                 moved_threshold=STREAM_BOARD_MOVED_THRESHOLD):
+        """
+        @param moved_threshold: the board moved when the overlap of its color mask with the mask of the frame
+        its corners were found on drops below this intersection over union
+        """
+        self.vehicles = vehicles
+        self.pyramid = pyramid
+        self.single_pass = single_pass
+        self.moved_threshold = moved_threshold
+        self.board_corners = None
+        self.board_orientation = None
+        self.board_mask = None
+        self.board_matrix = None
+
+    def board_moved(self, board_mask: np.ndarray) -> bool:
+        if self.board_corners is None or self.board_mask.shape != board_mask.shape:
+            return True
+        union = np.count_nonzero(board_mask | self.board_mask)
+        return not union or np.count_nonzero(board_mask & self.board_mask) / union < self.moved_threshold
+
+    def process_frame(self, frame: np.ndarray) -> Optional[np.ndarray]:
+        """
+        @param frame: BGR image
+        @return: the board matrix if it differs from the last one returned, otherwise None
+        """
+        board_image = BoardImage.from_frame(frame, self.pyramid, self.single_pass)
+        board_mask = cv2.inRange(board_image.detection_image, *BOARD_COLOR_RANGE) > 0
+        if self.board_moved(board_mask):
+            self.board_corners = self.board_orientation = None
+            self.board_mask = board_mask
+        try:
+            board_matrix = board_image.process(self.vehicles, self.board_corners, self.board_orientation)
+        except (BoardNotFoundError, cv2.error):
+            # No board in this frame, look for it again on the next one
+            self.board_corners = self.board_orientation = None
+            return None
+        self.board_corners = board_image.board_corners
+        self.board_orientation = board_image.board_orientation
+
+        if self.board_matrix is not None and np.array_equal(board_matrix, self.board_matrix):
+            return None
+        self.board_matrix = board_matrix
+        return board_matrix
+
+    def read(self, source: Union[str, int]) -> Iterator[np.ndarray]:
+        """
+        @param source: video file or camera index, anything cv2.VideoCapture opens
+        @return: every new board matrix of the stream
+        """
+        capture = cv2.VideoCapture(source)
+        try:
+            while True:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                board_matrix = self.process_frame(frame)
+                if board_matrix is not None:
+                    yield board_matrix
+        finally:
+            capture.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the board and its solution length whenever it changes")
+    parser.add_argument("source", help="video file, or camera index")
+    args = parser.parse_args()
+
+    source = int(args.source) if args.source.isdigit() else args.source
+    for board_matrix in BoardStream(VEHICLES).read(source):
+        solution = Board.from_matrix(board_matrix).find_solution(engine=SolverEngine.BITBOARD,
+                                                                 metric=MoveMetric.SLIDE)
+        print(board_matrix)
+        print(f"{len(solution)} moves" if solution is not None else "No solution", flush=True)
+
+
+if __name__ == '__main__':
+    main()
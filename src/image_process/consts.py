@@ -3,9 +3,45 @@ CORNERS_CANNY_THRESHOLD1 = 33
 CORNERS_CANNY_THRESHOLD2 = CORNERS_CANNY_THRESHOLD1 * 3
 CORNERS_MORPH_RECT_DIMENSIONS = (9, 9)
 CORNERS_MORPH_ITERATIONS = 3
+CORNERS_HOUGH_RHO = 2
+CORNERS_HOUGH_THRESHOLD = 300
 CORNERS_LINES_MIN_LENGTH = 0.065
 CORNERS_LINES_MAX_GAP = 0.125
 CORNERS_LINES_SLOPE_THRESHOLD = 0.5
 CORNERS_LINES_DISTANCE_THRESHOLD = 0.3
 CORNERS_APPROX_POLY_DP = 0.05
-
+CORNERS_HULL_THICKNESS = 5
+CORNERS_QUALITY_LEVEL = 0.01
+# Longest side of the photos the pixel sized parameters were tuned on
+REFERENCE_IMAGE_SIZE = 4032
+# Pyramid mode finds the board on a copy with this longest side and the vehicles on a board warped to this size
+PYRAMID_DETECTION_SIZE = 1000
+PYRAMID_BOARD_SIZE = 1200
+# Corners found on the copy must enclose at least this fraction of the image, else they are found at full size
+PYRAMID_MIN_BOARD_AREA = 0.1
+LOGO_COLOR_RANGE = ((90, 10, 120), (110, 50, 210))
+ORIENTATION_HORIZONTAL_RECT_DIMENSIONS = (9, 5)
+ORIENTATION_VERTICAL_RECT_DIMENSIONS = (5, 9)
+ORIENTATION_DILATE_ITERATIONS = (2, 3)
+ORIENTATION_CLOSE_ITERATIONS = 12
+LOGO_MORPH_RECT_DIMENSIONS = (3, 3)
+LOGO_MORPH_ITERATIONS = 5
+LOGO_MAX_ASPECT_RATIO = 3
+# The logo touches the board edge it is on within this fraction of the board
+LOGO_EDGE_MARGIN = 0.1
+# Logos and vehicles are larger than this fraction of a cell in both dimensions
+MIN_CELL_FRACTION = 0.6
+# Fractions of the warped board cut from its top, bottom, left and right, by the board orientation
+BOARD_EDGE_MARGINS = {
+    "DOWN": (0.08, 0.14, 0.06, 0.06),
+    "RIGHT": (0.06, 0.06, 0.14, 0.08),
+    "UP": (0.14, 0.09, 0.06, 0.06),
+    "LEFT": (0.06, 0.06, 0.08, 0.14),
+}
+VEHICLE_MORPH_KERNEL_SIZE = 5
+VEHICLE_ERODE_ITERATIONS = 3
+VEHICLE_ORIENTATION_RATIO_THRESHOLD = 1.2
+VEHICLE_LOCATION_THRESHOLD = 0.35
+VEHICLE_EDGE_THRESHOLD = 0.03
+# Seconds find_vehicles may spend on placing the vehicles it is unsure about before placing them greedily
+PLACEMENT_TIME_LIMIT = 0.5
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from src.consts import IMAGE_CACHE_MAX_BYTES
+from src.image_process import consts
+from src.image_process.board_image import BoardImage, BoardOrientation
+from src.image_process.image_vehicle import VehicleImage
+
+
+@dataclass(frozen=True)
+class ProcessResult:
+    board_matrix: np.ndarray
+    board_corners: np.ndarray
+    board_orientation: BoardOrientation
+
+    def to_dict(self) -> dict:
+        return {
+            "board_matrix": self.board_matrix.tolist(),
+            "board_corners": np.asarray(self.board_corners).tolist(),
+            "board_orientation": self.board_orientation.name
+        }
+
+    @staticmethod
+    def from_dict(result: dict) -> "ProcessResult":
+        return ProcessResult(np.array(result["board_matrix"]), np.array(result["board_corners"]),
+                             BoardOrientation[result["board_orientation"]])
+
+
+# Bump when a change to the pipeline code, and not to its constants, changes the results of BoardImage.process
+PIPELINE_VERSION = "1"
+
+
+def settings_hash(vehicles: list[VehicleImage], pyramid: bool, single_pass: bool) -> str:
+    """
+    Hash of everything besides the image that decides the result of BoardImage.process
+    """
+    # image_process.consts only holds detection settings, so a constant added there is part of the key
+    settings = sorted((name, repr(value)) for name, value in vars(consts).items() if not name.startswith("_"))
+    return hashlib.sha256(
+        repr((PIPELINE_VERSION, settings, vehicles, pyramid, single_pass)).encode()).hexdigest()
+
+
+class ImageCache:
+    """
+    Results of BoardImage.process on disk, one JSON file per image content and detection settings.
+    Least recently used files are evicted once the directory holds more than max_bytes.
+    """
+    directory: str
+    max_bytes: int
+    entries: OrderedDict[str, int]
+
+    def __init__(self, directory: str, max_bytes=IMAGE_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        files = []
+        for name in os.listdir(directory):
+            if name.endswith(".json"):
+                status = os.stat(os.path.join(directory, name))
+                files.append((status.st_mtime, name[:-len(".json")], status.st_size))
+        self.entries = OrderedDict((key, size) for _, key, size in sorted(files))
+        self.evict()
+
+    @staticmethod
+    def key(image_data: bytes, vehicles: list[VehicleImage], pyramid=False, single_pass=False) -> str:
+        content_hash = hashlib.sha256(image_data).hexdigest()
+        return f"{content_hash[:32]}-{settings_hash(vehicles, pyramid, single_pass)[:16]}"
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def size(self) -> int:
+        return sum(self.entries.values())
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[ProcessResult]:
+        if key not in self.entries:
+            return None
+        try:
+            with open(self.path(key), encoding="utf-8") as file:
+                result = ProcessResult.from_dict(json.load(file))
+        except (OSError, ValueError, KeyError):
+            # Removed or corrupted by someone else, forget it
+            self.entries.pop(key)
+            return None
+        os.utime(self.path(key))
+        self.entries.move_to_end(key)
+        return result
+
+    def put(self, key: str, result: ProcessResult):
+        data = json.dumps(result.to_dict())
+        temporary_path = f"{self.path(key)}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            file.write(data)
+        os.replace(temporary_path, self.path(key))
+        self.entries[key] = len(data.encode())
+        self.entries.move_to_end(key)
+        self.evict()
+
+    def evict(self):
+        size = self.size
+        while size > self.max_bytes and self.entries:
+            key, entry_size = self.entries.popitem(last=False)
+            size -= entry_size
+            try:
+                os.remove(self.path(key))
+            except FileNotFoundError:
+                pass
+
+
+def process_image(image_path: str, vehicles: list[VehicleImage], cache: Optional[ImageCache] = None,
+                  pyramid=False, single_pass=False) -> np.ndarray:
+    """
+    BoardImage(image_path).process(vehicles), answered from the cache when the same photo was processed before
+    """
+    with open(image_path, "rb") as file:
+        image_data = file.read()
+    if cache is not None:
+        key = ImageCache.key(image_data, vehicles, pyramid, single_pass)
+        result = cache.get(key)
+        if result is not None:
+            return result.board_matrix
+
+    result = detect_board(image_data, vehicles, pyramid, single_pass)
+    if cache is not None:
+        cache.put(key, result)
+    return result.board_matrix
+
+
+def detect_board(image_data: bytes, vehicles: list[VehicleImage], pyramid=False, single_pass=False) -> ProcessResult:
+    """
+    @param image_data: encoded image file content
+    """
+    image = cv2.imdecode(np.frombuffer(image_data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    board_image = BoardImage.from_frame(image, pyramid, single_pass)
+    board_matrix = board_image.process(vehicles)
+    return ProcessResult(board_matrix, board_image.board_corners, board_image.board_orientation)
@@ -0,0 +1,51 @@
+import time
+from typing import Optional
+
+
+class PlacementTimeout(Exception):
+    pass
+
+
+def solve_placements(candidate_masks: list[list[Optional[int]]], occupied: int,
+                     time_limit: float) -> Optional[list[int]]:
+    """
+    Backtracking search for one candidate per vehicle without overlaps. Candidates are tried in the given
+    order, so the first consistent assignment is the one that prefers the earlier vehicles' best candidates.
+    After every placement the remaining vehicles' candidates are filtered against the occupancy (forward
+    checking), a vehicle without candidates left ends the branch.
+    @param candidate_masks: occupancy bitmask of every candidate of every vehicle, None if it is off the board
+    @param occupied: bitmask of the slots already taken
+    @param time_limit: seconds before the search gives up
+    @return: index of the chosen candidate of every vehicle, None if there is no consistent assignment or the
+    time ran out
+    """
+    deadline = time.perf_counter() + time_limit
+
+    def search(vehicle_index, occupied, domains) -> Optional[list[int]]:
+        if vehicle_index == len(domains):
+            return []
+        if time.perf_counter() > deadline:
+            raise PlacementTimeout()
+        for candidate in domains[vehicle_index]:
+            next_occupied = occupied | candidate_masks[vehicle_index][candidate]
+            next_domains = domains[:vehicle_index + 1]
+            for later_index in range(vehicle_index + 1, len(domains)):
+                later_masks = candidate_masks[later_index]
+                domain = [index for index in domains[later_index] if not later_masks[index] & next_occupied]
+                if not domain:
+                    break
+                next_domains.append(domain)
+            else:
+                placements = search(vehicle_index + 1, next_occupied, next_domains)
+                if placements is not None:
+                    return [candidate, *placements]
+        return None
+
+    domains = [[index for index, mask in enumerate(masks) if mask is not None and not mask & occupied]
+               for masks in candidate_masks]
+    if not all(domains):
+        return None
+    try:
+        return search(0, occupied, domains)
+    except PlacementTimeout:
+        return None
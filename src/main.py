@@ -1,9 +1,13 @@
 from rush_hour import RushHour
+from src.consts import SOLUTION_CACHE_PATH, IMAGE_CACHE_PATH
+from src.solver.cache import SolutionCache
+from src.image_process.image_cache import ImageCache
 
 
 def main():
-    rh = RushHour()
-    rh.start()
+    with SolutionCache(SOLUTION_CACHE_PATH) as solution_cache:
+        rh = RushHour(solution_cache=solution_cache, image_cache=ImageCache(IMAGE_CACHE_PATH))
+        rh.start()
 
 
 if __name__ == '__main__':
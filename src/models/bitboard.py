@@ -0,0 +1,225 @@
+from dataclasses import dataclass
+from collections.abc import Iterator
+from weakref import WeakValueDictionary
+from functools import reduce, cached_property
+from operator import or_
+from .consts import BOARD_SIZE
+from .vehicle import Vehicle, VehicleOrientation
+
+# A bitboard state holds one occupancy mask per vehicle, bit (row * BOARD_SIZE + col) set for every occupied slot
+BitState = tuple[int, ...]
+
+# Packed states keep only the offset of every vehicle along its line, POSITION_BITS bits per vehicle
+POSITION_BITS = 3
+POSITION_MASK = (1 << POSITION_BITS) - 1
+
+FIRST_ROW_MASK = (1 << BOARD_SIZE) - 1
+LAST_ROW_MASK = FIRST_ROW_MASK << (BOARD_SIZE * (BOARD_SIZE - 1))
+FIRST_COL_MASK = sum(1 << (row * BOARD_SIZE) for row in range(BOARD_SIZE))
+LAST_COL_MASK = FIRST_COL_MASK << (BOARD_SIZE - 1)
+
+
+interned_layouts: WeakValueDictionary[tuple, "BitBoard"] = WeakValueDictionary()
+
+
+def slot_mask(row_index, col_index) -> int:
+    return 1 << (row_index * BOARD_SIZE + col_index)
+
+
+def mask_slots(mask: int) -> tuple[tuple[int, int]]:
+    slots = []
+    while mask:
+        low_bit = mask & -mask
+        slots.append(divmod(low_bit.bit_length() - 1, BOARD_SIZE))
+        mask ^= low_bit
+    return tuple(slots)
+
+
+@dataclass(frozen=True)
+class BitBoard:
+    """
+    Static layout of a board for the bitboard engine, the moving part lives in a BitState.
+    Layouts are interned, every board of a puzzle shares one layout and its position tables.
+    """
+    ids: tuple[int, ...]
+    sizes: tuple[int, ...]
+    orientations: tuple[VehicleOrientation, ...]
+    shifts: tuple[int, ...]
+    forward_edges: tuple[int, ...]
+    backward_edges: tuple[int, ...]
+    line_starts: tuple[int, ...]
+
+    @staticmethod
+    def from_vehicles(vehicles: tuple[Vehicle]) -> tuple["BitBoard", BitState]:
+        shifts, forward_edges, backward_edges, line_starts = [], [], [], []
+        for vehicle in vehicles:
+            row_index, col_index = vehicle.slots[0]
+            if vehicle.orientation == VehicleOrientation.VERTICAL:
+                shifts.append(BOARD_SIZE)
+                forward_edges.append(LAST_ROW_MASK)
+                backward_edges.append(FIRST_ROW_MASK)
+                line_starts.append(col_index)
+            else:
+                shifts.append(1)
+                forward_edges.append(LAST_COL_MASK)
+                backward_edges.append(FIRST_COL_MASK)
+                line_starts.append(row_index * BOARD_SIZE)
+
+        layout = BitBoard.intern(
+            ids=tuple(vehicle.id for vehicle in vehicles),
+            sizes=tuple(len(vehicle.slots) for vehicle in vehicles),
+            orientations=tuple(vehicle.orientation for vehicle in vehicles),
+            shifts=tuple(shifts),
+            forward_edges=tuple(forward_edges),
+            backward_edges=tuple(backward_edges),
+            line_starts=tuple(line_starts)
+        )
+        state = tuple(reduce(or_, (slot_mask(*slot) for slot in vehicle.slots), 0) for vehicle in vehicles)
+        return layout, state
+
+    @staticmethod
+    def intern(**fields) -> "BitBoard":
+        key = (fields["ids"], fields["sizes"], fields["orientations"], fields["line_starts"])
+        layout = interned_layouts.get(key)
+        if layout is None:
+            layout = interned_layouts.setdefault(key, BitBoard(**fields))
+        return layout
+
+    @cached_property
+    def position_masks(self) -> tuple[tuple[int, ...], ...]:
+        """
+        Occupancy mask of every vehicle at every offset along its line
+        """
+        return tuple(
+            tuple(base_mask << (offset * shift) for offset in range(BOARD_SIZE - size + 1))
+            for base_mask, shift, size in zip(self.base_masks, self.shifts, self.sizes)
+        )
+
+    @cached_property
+    def position_vehicles(self) -> tuple[tuple[Vehicle, ...], ...]:
+        """
+        Interned Vehicle of every vehicle at every offset along its line
+        """
+        return tuple(
+            tuple(Vehicle(id=vehicle_id, slots=mask_slots(mask), orientation=orientation) for mask in masks)
+            for vehicle_id, orientation, masks in zip(self.ids, self.orientations, self.position_masks)
+        )
+
+    def state_positions(self, state: BitState) -> bytes:
+        return bytes(
+            ((mask & -mask).bit_length() - 1 - line_start) // shift
+            for mask, line_start, shift in zip(state, self.line_starts, self.shifts)
+        )
+
+    def positions_state(self, positions: bytes) -> BitState:
+        return tuple(masks[position] for masks, position in zip(self.position_masks, positions))
+
+    def get_move(self, state: BitState, child: BitState) -> tuple[int, int]:
+        """
+        @return: the (vehicle id, delta) move that turns state into child
+        """
+        for vehicle_index, (mask, child_mask) in enumerate(zip(state, child)):
+            if mask != child_mask:
+                delta = ((child_mask & -child_mask).bit_length() - (mask & -mask).bit_length()) \
+                    // self.shifts[vehicle_index]
+                return self.ids[vehicle_index], delta
+
+    def get_path_moves(self, path: list[BitState]) -> list[tuple[int, int]]:
+        return [self.get_move(state, child) for state, child in zip(path, path[1:])]
+
+    def to_vehicles(self, state: BitState) -> tuple[Vehicle]:
+        return tuple(
+            Vehicle(id=vehicle_id, slots=mask_slots(mask), orientation=orientation)
+            for vehicle_id, mask, orientation in zip(self.ids, state, self.orientations)
+        )
+
+    def pack(self, state: BitState) -> int:
+        key = 0
+        for vehicle_index, mask in enumerate(state):
+            position = ((mask & -mask).bit_length() - 1 - self.line_starts[vehicle_index]) // self.shifts[vehicle_index]
+            key |= position << (vehicle_index * POSITION_BITS)
+        return key
+
+    def unpack(self, key: int) -> BitState:
+        return tuple(
+            self.base_masks[vehicle_index] << (((key >> (vehicle_index * POSITION_BITS)) & POSITION_MASK) * shift)
+            for vehicle_index, shift in enumerate(self.shifts)
+        )
+
+    @cached_property
+    def base_masks(self) -> tuple[int, ...]:
+        """
+        Occupancy mask of every vehicle when it is at offset 0 of its line
+        """
+        return tuple(
+            sum(1 << (line_start + offset * shift) for offset in range(size))
+            for line_start, shift, size in zip(self.line_starts, self.shifts, self.sizes)
+        )
+
+    def get_child_states(self, state: BitState) -> Iterator[BitState]:
+        occupied = reduce(or_, state, 0)
+        for vehicle_index, mask in enumerate(state):
+            shift = self.shifts[vehicle_index]
+            # Forward
+            if not mask & self.forward_edges[vehicle_index]:
+                moved = mask << shift
+                if not moved & ~mask & occupied:
+                    yield state[:vehicle_index] + (moved,) + state[vehicle_index + 1:]
+            # Backward
+            if not mask & self.backward_edges[vehicle_index]:
+                moved = mask >> shift
+                if not moved & ~mask & occupied:
+                    yield state[:vehicle_index] + (moved,) + state[vehicle_index + 1:]
+
+    def get_slide_child_states(self, state: BitState) -> Iterator[BitState]:
+        occupied = reduce(or_, state, 0)
+        for vehicle_index, mask in enumerate(state):
+            shift = self.shifts[vehicle_index]
+            others = occupied & ~mask
+            # Forward
+            moved = mask
+            while not moved & self.forward_edges[vehicle_index] and not (moved << shift) & others:
+                moved <<= shift
+                yield state[:vehicle_index] + (moved,) + state[vehicle_index + 1:]
+            # Backward
+            moved = mask
+            while not moved & self.backward_edges[vehicle_index] and not (moved >> shift) & others:
+                moved >>= shift
+                yield state[:vehicle_index] + (moved,) + state[vehicle_index + 1:]
+
+    def is_complete(self, state: BitState) -> bool:
+        return len(state) > 0 and self.ids[0] == 1 \
+            and self.orientations[0] == VehicleOrientation.HORIZONTAL \
+            and bool(state[0] & LAST_COL_MASK)
+
+    def get_child_keys(self, key: int, slide=False) -> Iterator[int]:
+        """
+        Children of a packed state, packed by adding to the moved vehicle's offset instead of packing every child
+        """
+        state = self.unpack(key)
+        occupied = reduce(or_, state, 0)
+        for vehicle_index, mask in enumerate(state):
+            shift = self.shifts[vehicle_index]
+            step = 1 << (vehicle_index * POSITION_BITS)
+            others = occupied & ~mask
+            # Forward
+            moved, child_key = mask, key
+            while not moved & self.forward_edges[vehicle_index] and not (moved << shift) & others:
+                moved <<= shift
+                child_key += step
+                yield child_key
+                if not slide:
+                    break
+            # Backward
+            moved, child_key = mask, key
+            while not moved & self.backward_edges[vehicle_index] and not (moved >> shift) & others:
+                moved >>= shift
+                child_key -= step
+                yield child_key
+                if not slide:
+                    break
+
+    def is_complete_key(self, key: int) -> bool:
+        return len(self.ids) > 0 and self.ids[0] == 1 \
+            and self.orientations[0] == VehicleOrientation.HORIZONTAL \
+            and key & POSITION_MASK == BOARD_SIZE - self.sizes[0]
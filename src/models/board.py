@@ -1,11 +1,45 @@
 from dataclasses import dataclass
+from enum import Enum
 import numpy as np
 from collections import defaultdict
 from collections.abc import Iterator
+from typing import Optional
 from .vehicle import Vehicle, VehicleOrientation, MoveDirection
-from operator import add, sub
+from .bitboard import BitBoard, BitState, slot_mask
+from .consts import BOARD_SIZE, VEHICLE_SIZES
+from src.solver.cache import SolutionCache, Move
+from src.solver.distance_table import DistanceTable
+from src.solver.anytime import SolveTask, iter_breadth_first_search
+from src.solver.bfs import breadth_first_search, compact_breadth_first_search
+from src.solver.heuristics import blocking_heuristic, slide_blocking_heuristic
+from src.solver.informed import a_star_search, ida_star_search
+from src.solver.parallel import parallel_breadth_first_search
+from src.solver.stats import SolveStats
+from src.solver.vectorized import vectorized_breadth_first_search
 
-BOARD_SIZE = 6
+
+class SolverEngine(Enum):
+    BOARD = 0
+    BITBOARD = 1
+
+
+class SearchStore(Enum):
+    DICT = 0
+    COMPACT = 1
+
+
+class SearchAlgorithm(Enum):
+    BFS = 0
+    A_STAR = 1
+    IDA_STAR = 2
+
+
+class MoveMetric(Enum):
+    STEP = 0
+    SLIDE = 1
+
+
+ENCODING_DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
 
 
 @dataclass(frozen=True)
@@ -14,18 +48,131 @@ class Node:
     parent: "Node"
     depth: int
 
+    def get_moves(self) -> list[Move]:
+        moves = []
+        node = self
+        while node.parent:
+            moves.append(node.parent.board.get_move(node.board))
+            node = node.parent
+        moves.reverse()
+        return moves
+
 
 @dataclass(frozen=True)
+class Solution:
+    """
+    A solution as its start board and a list of (vehicle id, delta) moves, boards are replayed on demand
+    """
+    start: "Board"
+    moves: tuple[Move, ...]
+
+    def __len__(self):
+        return len(self.moves)
+
+    @staticmethod
+    def inverse(move: Move) -> Move:
+        vehicle_id, delta = move
+        return vehicle_id, -delta
+
+    def boards(self) -> Iterator["Board"]:
+        board = self.start
+        yield board
+        for move in self.moves:
+            board = board.apply_move(move)
+            yield board
+
+    def board_at(self, index) -> "Board":
+        board = self.start
+        for move in self.moves[:index]:
+            board = board.apply_move(move)
+        return board
+
+    def to_node(self) -> Node:
+        return self.start.replay(list(self.moves))
+
+    def to_dict(self) -> dict:
+        return {"start": self.start.encode(), "moves": [list(move) for move in self.moves]}
+
+    @staticmethod
+    def from_dict(solution: dict) -> "Solution":
+        return Solution(Board.decode(solution["start"]), tuple(tuple(move) for move in solution["moves"]))
+
+
 class Board:
-    vehicles: tuple[Vehicle]
+    """
+    A board only holds the offset of every vehicle along its line, vehicles and their slots are looked up
+    in the position tables of the layout, which all the boards of a puzzle share
+    """
+    __slots__ = ("layout", "positions", "cached_hash")
+    layout: BitBoard
+    positions: bytes
+
+    def __init__(self, vehicles: tuple[Vehicle]):
+        layout, state = BitBoard.from_vehicles(vehicles)
+        self.layout = layout
+        self.positions = layout.state_positions(state)
+        self.cached_hash = None
+
+    @staticmethod
+    def from_positions(layout: BitBoard, positions: bytes) -> "Board":
+        board = Board.__new__(Board)
+        board.layout = layout
+        board.positions = positions
+        board.cached_hash = None
+        return board
+
+    @property
+    def vehicles(self) -> tuple[Vehicle]:
+        return tuple(vehicles[position] for vehicles, position in zip(self.layout.position_vehicles, self.positions))
+
+    def __eq__(self, other):
+        return isinstance(other, Board) and self.positions == other.positions and self.layout == other.layout
+
+    def __hash__(self):
+        if self.cached_hash is None:
+            self.cached_hash = hash(self.positions)
+        return self.cached_hash
+
+    def get_occupied_mask(self) -> int:
+        occupied = 0
+        for masks, position in zip(self.layout.position_masks, self.positions):
+            occupied |= masks[position]
+        return occupied
+
+    def get_bitboard_state(self) -> BitState:
+        return self.layout.positions_state(self.positions)
 
     @staticmethod
     def from_matrix(matrix: np.ndarray) -> "Board":
+        """
+        @param matrix: BOARD_SIZE x BOARD_SIZE vehicle ids, 0 for an empty slot
+        @raise ValueError: if the matrix is not a board or a vehicle is not a car or truck in a straight line
+        """
+        try:
+            shape = np.shape(matrix)
+        except ValueError:
+            # Rows of unequal length
+            shape = None
+        if shape != (BOARD_SIZE, BOARD_SIZE):
+            raise ValueError(f"Board must be a {BOARD_SIZE}x{BOARD_SIZE} matrix, got shape {shape}")
+        matrix = np.asarray(matrix)
+        if not np.issubdtype(matrix.dtype, np.integer):
+            raise ValueError(f"Board vehicle ids must be integers, got {matrix.dtype}")
         vehicles_dict = defaultdict(list)
         for row_index, row in enumerate(matrix):
             for col_index, col in enumerate(row):
                 if col:
-                    vehicles_dict[col].append((row_index, col_index))
+                    vehicles_dict[int(col)].append((row_index, col_index))
+
+        for vehicle_id, slots in vehicles_dict.items():
+            if not 0 < vehicle_id < len(ENCODING_DIGITS):
+                raise ValueError(f"Vehicle id {vehicle_id} is not between 1 and {len(ENCODING_DIGITS) - 1}")
+            if len(slots) not in VEHICLE_SIZES:
+                raise ValueError(f"Vehicle {vehicle_id} has {len(slots)} slots, vehicles have {VEHICLE_SIZES}")
+            (first_row, first_col), (last_row, last_col) = slots[0], slots[-1]
+            if (first_row != last_row and first_col != last_col) \
+                    or last_row - first_row + last_col - first_col != len(slots) - 1:
+                raise ValueError(f"Vehicle {vehicle_id} slots {slots} are not a straight line")
 
         vehicles = [
             Vehicle(
@@ -39,38 +186,147 @@ class Board:
     def is_slot_available(self, row_index, col_index):
         if not (0 <= row_index < BOARD_SIZE and 0 <= col_index < BOARD_SIZE):
             return False
-        for vehicle in self.vehicles:
-            if (row_index, col_index) in vehicle.slots:
-                return False
-        return True
+        return not self.get_occupied_mask() & slot_mask(row_index, col_index)
+
+    def with_position(self, vehicle_index, position) -> "Board":
+        positions = self.positions
+        return Board.from_positions(
+            self.layout, positions[:vehicle_index] + bytes((position,)) + positions[vehicle_index + 1:])
 
-    def move_vehicle(self, vehicle_index, direction: MoveDirection):
-        vehicles_list = list(self.vehicles)
-        vehicles_list[vehicle_index] = vehicles_list[vehicle_index].move(direction)
-        return Board(tuple(vehicles_list))
+    def move_vehicle(self, vehicle_index, direction: MoveDirection, distance=1):
+        return self.with_position(vehicle_index, self.positions[vehicle_index] + direction.value * distance)
+
+    def apply_move(self, move: Move) -> "Board":
+        vehicle_id, delta = move
+        vehicle_index = next(index for index, vehicle in enumerate(self.vehicles) if vehicle.id == vehicle_id)
+        direction = MoveDirection.FORWARD if delta > 0 else MoveDirection.BACKWARD
+        return self.move_vehicle(vehicle_index, direction, abs(delta))
+
+    def get_move(self, child: "Board") -> Move:
+        for vehicle, child_vehicle in zip(self.vehicles, child.vehicles):
+            if vehicle.slots != child_vehicle.slots:
+                (row, col), (child_row, child_col) = vehicle.slots[0], child_vehicle.slots[0]
+                return vehicle.id, child_row - row + child_col - col
+
+    def replay(self, moves: list[Move]) -> Node:
+        node = Node(board=self, parent=None, depth=0)
+        for depth, move in enumerate(moves, start=1):
+            node = Node(board=node.board.apply_move(move), parent=node, depth=depth)
+        return node
+
+    @staticmethod
+    def decode(encoding: str) -> "Board":
+        cells = [ENCODING_DIGITS.index(digit) for digit in encoding.upper()]
+        if len(cells) != BOARD_SIZE * BOARD_SIZE:
+            raise ValueError(f"Board encoding must have {BOARD_SIZE * BOARD_SIZE} digits, got {len(cells)}")
+        return Board.from_matrix(np.array(cells).reshape((BOARD_SIZE, BOARD_SIZE)))
+
+    def encode(self) -> str:
+        """
+        Canonical encoding of the board, the from_matrix cells in row-major order with one digit per vehicle id
+        """
+        cells = [0] * (BOARD_SIZE * BOARD_SIZE)
+        for vehicle in self.vehicles:
+            for row_index, col_index in vehicle.slots:
+                cells[row_index * BOARD_SIZE + col_index] = vehicle.id
+        return "".join(ENCODING_DIGITS[cell] for cell in cells)
 
     def get_child_boards(self) -> Iterator["Board"]:
-        for vehicle_index, vehicle in enumerate(self.vehicles):
-            if vehicle.orientation == VehicleOrientation.VERTICAL:
-                move = (1, 0)
-            else:
-                move = (0, 1)
+        occupied = self.get_occupied_mask()
+        for vehicle_index, (masks, position) in enumerate(zip(self.layout.position_masks, self.positions)):
+            others = occupied & ~masks[position]
             # Forward
-            if self.is_slot_available(*map(add, vehicle.slots[-1], move)):
-                yield self.move_vehicle(vehicle_index, MoveDirection.FORWARD)
+            if position + 1 < len(masks) and not masks[position + 1] & others:
+                yield self.with_position(vehicle_index, position + 1)
             # Backward
-            if self.is_slot_available(*map(sub, vehicle.slots[0], move)):
-                yield self.move_vehicle(vehicle_index, MoveDirection.BACKWARD)
+            if position > 0 and not masks[position - 1] & others:
+                yield self.with_position(vehicle_index, position - 1)
 
     def is_complete(self):
-        return self.vehicles[0].id == 1 \
-            and self.vehicles[0].orientation == VehicleOrientation.HORIZONTAL \
-            and self.vehicles[0].slots[-1][1] == BOARD_SIZE - 1
+        layout = self.layout
+        return len(layout.ids) > 0 and layout.ids[0] == 1 \
+            and layout.orientations[0] == VehicleOrientation.HORIZONTAL \
+            and self.positions[0] == len(layout.position_masks[0]) - 1
 
     def is_empty(self):
-        return len(self.vehicles) == 0
+        return len(self.positions) == 0
+
+    def canonical_encoding(self) -> tuple[str, dict[int, int]]:
+        """
+        Encoding of the board with the red car kept as 1 and every other vehicle renumbered by the order of its
+        first slot. Vehicles never leave their line or pass each other, so a single search can't meet two labelings
+        of one layout, but boards that only differ by vehicle colors get the same canonical encoding.
+        @return: the canonical encoding and a map from canonical ids back to this board's vehicle ids
+        """
+        canonical_ids = {1: 1}
+        cells = []
+        for digit in self.encode():
+            vehicle_id = ENCODING_DIGITS.index(digit)
+            if vehicle_id and vehicle_id not in canonical_ids:
+                canonical_ids[vehicle_id] = len(canonical_ids) + 1
+            cells.append(canonical_ids.get(vehicle_id, 0))
+        return "".join(ENCODING_DIGITS[cell] for cell in cells), \
+            {canonical_id: vehicle_id for vehicle_id, canonical_id in canonical_ids.items()}
+
+    def solve(self, max_depth=93, engine=SolverEngine.BOARD, cache: Optional[SolutionCache] = None,
+              symmetry=False, **options) -> Optional[Node]:
+        solution = self.find_solution(max_depth, engine, cache, symmetry, **options)
+        return solution.to_node() if solution is not None else None
+
+    def find_solution(self, max_depth=93, engine=SolverEngine.BOARD, cache: Optional[SolutionCache] = None,
+                      symmetry=False, **options) -> Optional[Solution]:
+        """
+        @param cache: solution cache that is checked before searching and updated with every new solution
+        @param symmetry: key the cache by canonical_encoding, so boards that only differ by the ids of their
+        non-red vehicles share one entry, the cached moves are mapped back to this board's ids
+        @param options: keyword arguments of find_bitboard_path, only supported by the bitboard engine
+        """
+        metric = options.get("metric", MoveMetric.STEP)
+        if cache is not None:
+            moves = self.get_cached_moves(cache, metric, symmetry)
+            if moves is not None:
+                return Solution(self, tuple(moves)) if len(moves) <= max_depth else None
+
+        if engine == SolverEngine.BITBOARD:
+            path = self.find_bitboard_path(max_depth, **options)
+            moves = self.layout.get_path_moves(path) if path else None
+        elif options:
+            raise ValueError(f"Solver options {', '.join(options)} require the bitboard engine")
+        else:
+            node = self.solve_board(max_depth)
+            moves = node.get_moves() if node else None
+        if moves is None:
+            return None
+
+        if cache is not None:
+            self.put_cached_moves(cache, moves, metric, symmetry)
+        return Solution(self, tuple(moves))
+
+    def solution_cache_key(self, metric=MoveMetric.STEP, symmetry=False) -> tuple[str, Optional[dict[int, int]]]:
+        """
+        @return: the solution cache key of the board and, with symmetry, the canonical_encoding id map
+        """
+        encoding, canonical_ids = self.canonical_encoding() if symmetry else (self.encode(), None)
+        return f"{metric.name}:{encoding}", canonical_ids
+
+    def get_cached_moves(self, cache: SolutionCache, metric=MoveMetric.STEP, symmetry=False) -> Optional[list[Move]]:
+        """
+        @return: the cached solution moves with this board's vehicle ids, None if the board is not cached
+        """
+        cache_key, canonical_ids = self.solution_cache_key(metric, symmetry)
+        moves = cache.get(cache_key)
+        if moves is not None and canonical_ids:
+            moves = [(canonical_ids[vehicle_id], delta) for vehicle_id, delta in moves]
+        return moves
+
+    def put_cached_moves(self, cache: SolutionCache, moves: list[Move], metric=MoveMetric.STEP, symmetry=False):
+        cache_key, canonical_ids = self.solution_cache_key(metric, symmetry)
+        if canonical_ids:
+            real_ids = {real_id: canonical_id for canonical_id, real_id in canonical_ids.items()}
+            moves = [(real_ids[vehicle_id], delta) for vehicle_id, delta in moves]
+        cache.put(cache_key, moves)
 
-    def solve(self, max_depth=93):
+    def solve_board(self, max_depth=93) -> Optional[Node]:
         root = Node(board=self, parent=None, depth=0)
         visited_boards = set()
         queue = [root]
@@ -92,9 +348,131 @@ class Board:
                     if child_board.is_complete():
                         return next_node
 
-    def __repr__(self):
+    def find_bitboard_path(self, max_depth=93, store=SearchStore.DICT, memory_limit=None,
+                           algorithm=SearchAlgorithm.BFS, heuristic=None, metric=MoveMetric.STEP,
+                           stats: Optional[SolveStats] = None, workers=1, vectorized=False,
+                           transposition_limit: Optional[int] = None) -> Optional[list[BitState]]:
+        """
+        @param heuristic: callable(BitBoard, BitState) -> int used by A* and IDA*, must never overestimate
+        the remaining number of moves for the solution to stay optimal
+        @param metric: STEP moves a vehicle one slot per move, SLIDE moves it any number of free slots
+        @param stats: filled with search statistics when given
+        @param workers: number of processes that expand every BFS level together
+        @param vectorized: expand every BFS level as a whole with NumPy array operations
+        @param transposition_limit: maximum number of states in the IDA* transposition table
+        """
+        layout, state = self.layout, self.get_bitboard_state()
+        get_child_states = layout.get_slide_child_states if metric == MoveMetric.SLIDE else layout.get_child_states
+        is_complete = layout.is_complete
+        if store == SearchStore.COMPACT:
+            generate_child_states = get_child_states
+
+            def get_child_states(key):
+                return map(layout.pack, generate_child_states(layout.unpack(key)))
+
+            def is_complete(key):
+                return layout.is_complete(layout.unpack(key))
+
+        if stats is not None and not vectorized:
+            get_child_states, is_complete = stats.instrument(get_child_states, is_complete)
+
+        if algorithm != SearchAlgorithm.BFS:
+            if store != SearchStore.DICT or memory_limit is not None:
+                raise ValueError("The compact search store only supports BFS")
+            if heuristic is None:
+                heuristic = slide_blocking_heuristic if metric == MoveMetric.SLIDE else blocking_heuristic
+            if algorithm == SearchAlgorithm.A_STAR:
+                if transposition_limit is not None:
+                    raise ValueError("transposition_limit is only used by IDA*")
+                path = a_star_search(state, get_child_states, is_complete, lambda child: heuristic(layout, child),
+                                     max_depth)
+            else:
+                # The transposition table holds packed int keys, far smaller than state tuples
+                limit_options = {"transposition_limit": transposition_limit} if transposition_limit is not None else {}
+                path = ida_star_search(state, get_child_states, is_complete, lambda child: heuristic(layout, child),
+                                       max_depth, key=layout.pack, **limit_options)
+        elif transposition_limit is not None:
+            raise ValueError("transposition_limit is only used by IDA*")
+        elif heuristic is not None:
+            raise ValueError("heuristic is only used by A* and IDA*")
+        elif vectorized:
+            if store != SearchStore.DICT or memory_limit is not None or workers > 1:
+                raise ValueError("Vectorized BFS does not support the compact search store or workers")
+            path = vectorized_breadth_first_search(
+                layout, layout.pack(state), metric == MoveMetric.SLIDE, max_depth, stats)
+            path = list(map(layout.unpack, path)) if path else None
+        elif workers > 1:
+            if store != SearchStore.DICT or memory_limit is not None or stats is not None:
+                raise ValueError("Parallel BFS does not support the compact search store or stats")
+            path = parallel_breadth_first_search(
+                layout, layout.pack(state), metric == MoveMetric.SLIDE, max_depth, workers)
+            path = list(map(layout.unpack, path)) if path else None
+        elif store == SearchStore.COMPACT:
+            path = compact_breadth_first_search(
+                layout.pack(state), get_child_states, is_complete, max_depth, memory_limit, stats)
+            path = list(map(layout.unpack, path)) if path else None
+        elif memory_limit is not None:
+            raise ValueError("memory_limit is only supported by the compact search store")
+        else:
+            path = breadth_first_search(state, get_child_states, is_complete, max_depth, stats)
+        if stats is not None and path:
+            stats.solution_depth = len(path) - 1
+        return path
+
+    def build_distance_table(self, metric=MoveMetric.STEP) -> DistanceTable:
+        layout, state = self.layout, self.get_bitboard_state()
+        return DistanceTable.build(layout, state, metric == MoveMetric.SLIDE)
+
+    def to_bitboard_state(self, table: DistanceTable) -> BitState:
+        layout, state = self.layout, self.get_bitboard_state()
+        if layout != table.layout:
+            raise ValueError("Board does not have the vehicles of the table's puzzle")
+        return state
+
+    def distance_to_goal(self, table: DistanceTable) -> Optional[int]:
+        return table.distance(self.to_bitboard_state(table))
+
+    def get_hint(self, table: DistanceTable) -> Optional["Board"]:
+        """
+        @return: the board after the optimal next move, None if the board is solved or can not be solved
+        """
+        state = table.best_move(self.to_bitboard_state(table))
+        return Board.from_positions(table.layout, table.layout.state_positions(state)) if state else None
+
+    def solve_with_table(self, table: DistanceTable) -> Optional[Node]:
+        path = table.path(self.to_bitboard_state(table))
+        return self.path_to_node(table.layout, path) if path else None
+
+    def iter_solve(self, max_depth=93, metric=MoveMetric.STEP, node_budget: Optional[int] = None,
+                   deadline: Optional[float] = None, memory_budget: Optional[int] = None,
+                   progress_interval=4096) -> SolveTask:
+        """
+        Anytime BFS with the bitboard engine and the compact store, iterate over the returned task for progress
+        @param deadline: time.monotonic() value after which the search gives up
+        @param memory_budget: maximal size of the search store in bytes
+        """
+        layout, state = self.layout, self.get_bitboard_state()
+        get_child_states = layout.get_slide_child_states if metric == MoveMetric.SLIDE else layout.get_child_states
+        search = iter_breadth_first_search(
+            layout.pack(state),
+            lambda key: map(layout.pack, get_child_states(layout.unpack(key))),
+            lambda key: layout.is_complete(layout.unpack(key)),
+            max_depth, node_budget, deadline, memory_budget, progress_interval
+        )
+        return SolveTask(search, lambda path: self.path_to_node(layout, list(map(layout.unpack, path))))
+
+    def path_to_node(self, layout: BitBoard, path: list[BitState]) -> Node:
+        node = Node(board=self, parent=None, depth=0)
+        for depth, state in enumerate(path[1:], start=1):
+            node = Node(board=Board.from_positions(layout, layout.state_positions(state)), parent=node, depth=depth)
+        return node
+
+    def to_matrix(self) -> np.ndarray:
         matrix = np.zeros((BOARD_SIZE, BOARD_SIZE), dtype=int)
         for vehicle in self.vehicles:
             for slot in vehicle.slots:
                 matrix[slot[0], slot[1]] = vehicle.id
-        return str(matrix)
+        return matrix
+
+    def __repr__(self):
+        return str(self.to_matrix())
@@ -0,0 +1,3 @@
+BOARD_SIZE = 6
+# Cars take 2 slots and trucks 3
+VEHICLE_SIZES = (2, 3)
@@ -1,5 +1,5 @@
 from enum import Enum, IntEnum
-from dataclasses import dataclass, replace
+from dataclasses import dataclass
 
 
 class VehicleOrientation(Enum):
@@ -17,12 +17,3 @@ class Vehicle:
     id: int
     slots: tuple[tuple[int, int]]
     orientation: VehicleOrientation
-
-    def move(self, direction: MoveDirection) -> "Vehicle":
-        slots = map(
-            lambda s: (s[0] + direction.value, s[1])
-            if self.orientation == VehicleOrientation.VERTICAL
-            else (s[0], s[1] + direction.value),
-            self.slots
-        )
-        return replace(self, slots=tuple(slots))
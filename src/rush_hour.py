@@ -1,29 +1,53 @@
+import time
 import tkinter
 from tkinter import filedialog, TOP, LEFT, RIGHT
+from typing import Optional
 import numpy as np
 from PIL import ImageTk, Image
 
 from src.consts import *
-from src.models.board import Board, Vehicle
-from src.image_process.board_image import BoardImage
+from src.models.board import Board, Vehicle, SolverEngine, MoveMetric, Solution
+from src.image_process.image_cache import ImageCache, process_image
+from src.solver.cache import SolutionCache
 
 
 class RushHour:
     board: Board
     board_canvas: tkinter.Canvas
-    solution_boards: list[Board]
+    solution: Solution
+    solution_board: Board
     current_solution_board_index: int
     text_label: tkinter.Label
     upload_image_button: tkinter.Button
     solve_button: tkinter.Button
     next_button: tkinter.Button
     prev_button: tkinter.Button
+    play_button: tkinter.Button
     win_image: tkinter.Image
+    solution_cache: SolutionCache
+    image_cache: ImageCache
+    drawn_board: Optional[Board]
+    vehicle_items: list[int]
+    vehicle_rectangles: list[list[tuple[int, int, int, int]]]
+    animation_fps: int
+    animation: Optional[dict]
 
-    def __init__(self, board=None):
+    def __init__(self, board=None, solution_cache: SolutionCache = None, image_cache: ImageCache = None,
+                 animation_fps=ANIMATION_FPS):
+        """
+        @param animation_fps: frame rate of the solution autoplay
+        """
         self.board = board if board else Board.from_matrix(np.zeros((6, 6), dtype=int))
-        self.solution_boards = []
+        self.solution_cache = solution_cache
+        self.image_cache = image_cache
+        self.solution = None
+        self.solution_board = self.board
         self.current_solution_board_index = 0
+        self.drawn_board = None
+        self.vehicle_items = []
+        self.vehicle_rectangles = []
+        self.animation_fps = animation_fps
+        self.animation = None
 
     def start(self):
         root = tkinter.Tk()
@@ -61,6 +85,9 @@ class RushHour:
 
         self.next_button = tkinter.Button(button_frame, image=next_photo_image, state='disabled', command=self.next)
 
+        self.play_button = tkinter.Button(button_frame, text='\u25B6', font=('Arial', 20, 'bold'), width=2,
+                                          state='disabled', command=self.play)
+
         self.text_label = tkinter.Label(button_frame, fg='red', font=('Arial', 20, 'bold'))
 
         self.upload_image_button.grid(row=0, column=0, columnspan=1)
@@ -69,6 +96,7 @@ class RushHour:
         button_frame.columnconfigure(2, weight=1)
         self.prev_button.grid(row=0, column=3, columnspan=1)
         self.next_button.grid(row=0, column=4, columnspan=1)
+        self.play_button.grid(row=0, column=5, columnspan=1)
 
         self.win_image = tkinter.PhotoImage(file='resources/win.png')
 
@@ -81,43 +109,47 @@ class RushHour:
     def upload_image(self):
         file_path = filedialog.askopenfilename()
         if file_path:
-            board_image = BoardImage(file_path)
-            self.board = Board.from_matrix(board_image.process(VEHICLES))
+            self.board = Board.from_matrix(process_image(file_path, VEHICLES, self.image_cache))
             self.text_label["text"] = ""
             self.next_button["state"] = "disabled"
             self.prev_button["state"] = "disabled"
+            self.play_button["state"] = "disabled"
             self.draw_board(self.board)
             self.solve_button["state"] = "normal"
 
     def solve(self):
-        node = self.board.solve()
-        self.solution_boards = []
-        curr_node = node
-        while curr_node:
-            self.solution_boards.insert(0, curr_node.board)
-            curr_node = curr_node.parent
+        self.solution = self.board.find_solution(engine=SolverEngine.BITBOARD, cache=self.solution_cache,
+                                                 symmetry=True, metric=MoveMetric.SLIDE)
+        self.solution_board = self.board
         self.current_solution_board_index = 0
         self.solve_button["state"] = "disabled"
-        if len(self.solution_boards) > 0:
+        if self.solution is not None:
             self.next_button["state"] = "normal"
+            self.play_button["state"] = "normal"
         else:
             self.text_label["text"] = "No solution"
 
     def next(self):
-        if self.solution_boards and self.current_solution_board_index <= len(self.solution_boards):
+        if self.solution is not None and self.current_solution_board_index <= len(self.solution):
             self.current_solution_board_index += 1
-            if self.current_solution_board_index == len(self.solution_boards):
+            if self.current_solution_board_index == len(self.solution) + 1:
                 self.next_button["state"] = "disabled"
-                self.board_canvas.delete('vehicle')
+                self.board_canvas.itemconfigure('vehicle', state='hidden')
                 self.board_canvas.create_image(200, 200, image=self.win_image, tag='win')
             else:
-                self.draw_board(self.solution_boards[self.current_solution_board_index])
-            self.prev_button["state"] = "normal"
+                move = self.solution.moves[self.current_solution_board_index - 1]
+                self.solution_board = self.solution_board.apply_move(move)
+                self.draw_board(self.solution_board)
+            if self.animation is None:
+                self.prev_button["state"] = "normal"
 
     def prev(self):
-        if self.solution_boards and self.current_solution_board_index > 0:
+        if self.solution is not None and self.current_solution_board_index > 0:
+            if self.current_solution_board_index <= len(self.solution):
+                move = self.solution.moves[self.current_solution_board_index - 1]
+                self.solution_board = self.solution_board.apply_move(Solution.inverse(move))
             self.current_solution_board_index -= 1
-            self.draw_board(self.solution_boards[self.current_solution_board_index])
+            self.draw_board(self.solution_board)
             self.next_button["state"] = "normal"
             self.board_canvas.delete('win')
             if self.current_solution_board_index == 0:
@@ -134,26 +166,117 @@ class RushHour:
             x = column * CELL_SIZE
             self.board_canvas.create_line((x, ymin, x, ymax), fill='#969696')
 
-    def draw_board(self, board: Board):
-        self.board_canvas.delete('vehicle')
-        self.board_canvas.delete('win')
-        self.draw_vehicles(board.vehicles)
+    def play(self):
+        """
+        Plays the rest of the solution, or stops a running autoplay
+        """
+        if self.animation is not None:
+            self.stop_animation()
+            return
+        if self.solution is None:
+            return
+        if not self.solution.moves:
+            self.next()
+            return
+        if self.current_solution_board_index >= len(self.solution):
+            # Nothing left to play, replay from the start
+            self.solution_board = self.solution.start
+            self.current_solution_board_index = 0
+            self.draw_board(self.solution_board)
+        for button in (self.upload_image_button, self.prev_button, self.next_button):
+            button["state"] = "disabled"
+        self.play_button["text"] = '\u25A0'
+        now = time.perf_counter()
+        self.animation = {"move_start": now, "next_frame": now}
+        self.start_animation_move()
+        self.animate_frame()
+
+    def start_animation_move(self):
+        """
+        Sets up the animation of the solution move that follows the current board
+        """
+        move = self.solution.moves[self.current_solution_board_index]
+        target_board = self.solution_board.apply_move(move)
+        vehicle_index = next(index for index, (position, target_position)
+                             in enumerate(zip(self.solution_board.positions, target_board.positions))
+                             if position != target_position)
+        self.animation.update(
+            vehicle_index=vehicle_index,
+            start=self.vehicle_rectangles[vehicle_index][self.solution_board.positions[vehicle_index]],
+            end=self.vehicle_rectangles[vehicle_index][target_board.positions[vehicle_index]],
+            duration=abs(move[1]) * ANIMATION_CELL_TIME
+        )
+
+    def animate_frame(self):
+        """
+        Draws one frame and schedules the next one. Vehicle positions follow the clock and not the frame count,
+        so a late frame catches up instead of slowing the whole animation down.
+        """
+        animation = self.animation
+        now = time.perf_counter()
+        while self.animation is not None and now >= animation["move_start"] + animation["duration"]:
+            # The move is over, commit it and continue the next move from where the timeline is
+            move_end = animation["move_start"] + animation["duration"]
+            self.next()
+            if self.current_solution_board_index == len(self.solution):
+                self.next()
+                self.stop_animation()
+                return
+            animation["move_start"] = move_end
+            self.start_animation_move()
+
+        progress = (now - animation["move_start"]) / animation["duration"]
+        start, end = animation["start"], animation["end"]
+        self.board_canvas.coords(self.vehicle_items[animation["vehicle_index"]],
+                                 *(a + (b - a) * progress for a, b in zip(start, end)))
+
+        frame_time = 1 / self.animation_fps
+        animation["next_frame"] = max(animation["next_frame"] + frame_time, now)
+        delay = round((animation["next_frame"] - time.perf_counter()) * 1000)
+        animation["job"] = self.board_canvas.after(max(1, delay), self.animate_frame)
 
-    def draw_vehicles(self, vehicles: tuple[Vehicle]):
-        for vehicle in vehicles:
-            self.draw_vehicle(vehicle)
+    def stop_animation(self):
+        job = self.animation.get("job")
+        if job is not None:
+            self.board_canvas.after_cancel(job)
+        self.animation = None
+        self.play_button["text"] = '\u25B6'
+        self.upload_image_button["state"] = "normal"
+        if self.current_solution_board_index <= len(self.solution):
+            # Snap a vehicle stopped halfway back to its slots
+            self.draw_board(self.solution_board, redraw=True)
+            self.next_button["state"] = "normal"
+        if self.current_solution_board_index > 0:
+            self.prev_button["state"] = "normal"
 
-    def draw_vehicle(self, vehicle):
+    def draw_board(self, board: Board, redraw=False):
+        """
+        Vehicles keep one canvas item per board layout, only the items of vehicles that moved since the last
+        drawn board are updated
+        @param redraw: update every item, for items that were moved outside draw_board
+        """
+        self.board_canvas.delete('win')
+        if self.drawn_board is None or board.layout != self.drawn_board.layout:
+            self.board_canvas.delete('vehicle')
+            self.vehicle_rectangles = [[RushHour.vehicle_rectangle(vehicle) for vehicle in vehicles]
+                                       for vehicles in board.layout.position_vehicles]
+            self.vehicle_items = [self.draw_vehicle(vehicle) for vehicle in board.vehicles]
+        else:
+            self.board_canvas.itemconfigure('vehicle', state='normal')
+            for vehicle_index, (position, drawn_position) in enumerate(zip(board.positions,
+                                                                           self.drawn_board.positions)):
+                if redraw or position != drawn_position:
+                    self.board_canvas.coords(self.vehicle_items[vehicle_index],
+                                             *self.vehicle_rectangles[vehicle_index][position])
+        self.drawn_board = board
+
+    @staticmethod
+    def vehicle_rectangle(vehicle: Vehicle) -> tuple[int, int, int, int]:
         min_row, min_col = map(min, zip(*vehicle.slots))
         max_row, max_col = map(max, zip(*vehicle.slots))
-        if min_row == max_row:
-            xmin = min_col * CELL_SIZE + MARGIN
-            ymin = min_row * CELL_SIZE + MARGIN
-            xmax = (max_col + 1) * CELL_SIZE - MARGIN
-            ymax = (max_row + 1) * CELL_SIZE - MARGIN
-        else:
-            xmin = min_col * CELL_SIZE + MARGIN
-            ymin = min_row * CELL_SIZE + MARGIN
-            xmax = (max_col + 1) * CELL_SIZE - MARGIN
-            ymax = (max_row + 1) * CELL_SIZE - MARGIN
-        self.board_canvas.create_rectangle((xmin, ymin, xmax, ymax), width=2, fill=VEHICLE_COLORS[vehicle.id], tags='vehicle')
+        return (min_col * CELL_SIZE + MARGIN, min_row * CELL_SIZE + MARGIN,
+                (max_col + 1) * CELL_SIZE - MARGIN, (max_row + 1) * CELL_SIZE - MARGIN)
+
+    def draw_vehicle(self, vehicle: Vehicle) -> int:
+        return self.board_canvas.create_rectangle(RushHour.vehicle_rectangle(vehicle), width=2,
+                                                  fill=VEHICLE_COLORS[vehicle.id], tags='vehicle')
@@ -0,0 +1,134 @@
+import time
+from dataclasses import dataclass
+from enum import Enum
+from collections.abc import Callable, Generator, Iterable
+from typing import Optional
+from .store import CompactStateStore, SearchMemoryExceeded
+
+
+class SolveStatus(Enum):
+    SOLVED = 0
+    NO_SOLUTION = 1
+    NODE_BUDGET_EXCEEDED = 2
+    TIME_BUDGET_EXCEEDED = 3
+    MEMORY_BUDGET_EXCEEDED = 4
+    DEPTH_BUDGET_EXCEEDED = 5
+    CANCELLED = 6
+
+
+@dataclass(frozen=True)
+class SolveProgress:
+    depth: int
+    nodes_expanded: int
+    frontier_size: int
+    visited_size: int
+    memory_usage: int
+    elapsed: float
+
+
+@dataclass(frozen=True)
+class SolveResult:
+    status: SolveStatus
+    node: Optional[object]
+    progress: SolveProgress
+
+    @property
+    def budget_exceeded(self) -> bool:
+        return self.status in (SolveStatus.NODE_BUDGET_EXCEEDED, SolveStatus.TIME_BUDGET_EXCEEDED,
+                               SolveStatus.MEMORY_BUDGET_EXCEEDED, SolveStatus.DEPTH_BUDGET_EXCEEDED)
+
+
+SearchGenerator = Generator[SolveProgress, None, tuple[SolveStatus, Optional[list[int]], SolveProgress]]
+
+
+def iter_breadth_first_search(start: int,
+                              get_children: Callable[[int], Iterable[int]],
+                              is_goal: Callable[[int], bool],
+                              max_depth=93,
+                              node_budget: Optional[int] = None,
+                              deadline: Optional[float] = None,
+                              memory_budget: Optional[int] = None,
+                              progress_interval=4096) -> SearchGenerator:
+    """
+    BFS over packed states in a CompactStateStore that yields its progress after every level and every
+    progress_interval expanded nodes, and stops as soon as one of the budgets runs out
+    @param deadline: time.monotonic() value after which the search gives up
+    @return: the final status, the path of states if one was found and the last progress
+    """
+    start_time = time.monotonic()
+    store = CompactStateStore()
+    store.add(start)
+    level_start, level_end = 0, 1
+    depth = 0
+    nodes_expanded = 0
+
+    def progress():
+        return SolveProgress(depth, nodes_expanded, len(store) - level_end, len(store), store.memory_usage,
+                             time.monotonic() - start_time)
+
+    if is_goal(start):
+        return SolveStatus.SOLVED, [start], progress()
+    store.memory_limit = memory_budget
+
+    try:
+        while level_start < level_end and depth < max_depth:
+            depth += 1
+            for index in range(level_start, level_end):
+                if node_budget is not None and nodes_expanded >= node_budget:
+                    return SolveStatus.NODE_BUDGET_EXCEEDED, None, progress()
+                if nodes_expanded % progress_interval == 0 and nodes_expanded:
+                    if deadline is not None and time.monotonic() > deadline:
+                        return SolveStatus.TIME_BUDGET_EXCEEDED, None, progress()
+                    yield progress()
+                nodes_expanded += 1
+                for child in get_children(store.states[index]):
+                    child_index = store.add(child, index)
+                    if child_index != -1 and is_goal(child):
+                        return SolveStatus.SOLVED, store.trace(child_index), progress()
+            level_start, level_end = level_end, len(store)
+            if deadline is not None and time.monotonic() > deadline:
+                return SolveStatus.TIME_BUDGET_EXCEEDED, None, progress()
+            yield progress()
+    except SearchMemoryExceeded:
+        return SolveStatus.MEMORY_BUDGET_EXCEEDED, None, progress()
+    if level_start < level_end:
+        return SolveStatus.DEPTH_BUDGET_EXCEEDED, None, progress()
+    return SolveStatus.NO_SOLUTION, None, progress()
+
+
+class SolveTask:
+    """
+    Iterating over a task runs the search and yields its progress, once iteration stops result is set.
+    cancel() stops the search at its next progress report with a CANCELLED result.
+    """
+    result: Optional[SolveResult]
+
+    def __init__(self, search: SearchGenerator, make_node: Callable[[list[int]], object]):
+        self.search = search
+        self.make_node = make_node
+        self.cancelled = False
+        self.result = None
+        self.last_progress = SolveProgress(0, 0, 0, 0, 0, 0.0)
+
+    def __iter__(self) -> Generator[SolveProgress, None, None]:
+        while self.result is None:
+            if self.cancelled:
+                self.search.close()
+                self.result = SolveResult(SolveStatus.CANCELLED, None, self.last_progress)
+                break
+            try:
+                progress = next(self.search)
+            except StopIteration as stop:
+                status, path, progress = stop.value
+                self.result = SolveResult(status, self.make_node(path) if path else None, progress)
+                break
+            self.last_progress = progress
+            yield progress
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self) -> SolveResult:
+        for _ in self:
+            pass
+        return self.result
@@ -0,0 +1,81 @@
+from collections.abc import Callable, Hashable, Iterable
+from typing import Optional
+from .store import CompactStateStore
+from .stats import SolveStats
+
+
+def trace_path(parents: dict, state: Hashable) -> list:
+    path = [state]
+    while parents[state] is not None:
+        state = parents[state]
+        path.append(state)
+    path.reverse()
+    return path
+
+
+def breadth_first_search(start: Hashable,
+                         get_children: Callable[[Hashable], Iterable[Hashable]],
+                         is_goal: Callable[[Hashable], bool],
+                         max_depth=93,
+                         stats: Optional[SolveStats] = None) -> Optional[list]:
+    """
+    Level by level BFS over hashable states, parents are kept in a single dict instead of per state nodes
+    @param stats: gets per depth statistics, expects get_children and is_goal to be instrumented by it
+    @return: the states from start to the first goal found, or None if there is none within max_depth
+    """
+    if is_goal(start):
+        return [start]
+    parents = {start: None}
+    frontier = [start]
+    depth = 0
+
+    while frontier and depth < max_depth:
+        depth += 1
+        if stats is not None:
+            stats.start_level()
+        next_frontier = []
+        for state in frontier:
+            for child in get_children(state):
+                if child not in parents:
+                    parents[child] = state
+                    if is_goal(child):
+                        if stats is not None:
+                            stats.end_level(depth, len(next_frontier) + 1, len(parents))
+                        return trace_path(parents, child)
+                    next_frontier.append(child)
+        frontier = next_frontier
+        if stats is not None:
+            stats.end_level(depth, len(frontier), len(parents))
+
+
+def compact_breadth_first_search(start: int,
+                                 get_children: Callable[[int], Iterable[int]],
+                                 is_goal: Callable[[int], bool],
+                                 max_depth=93,
+                                 memory_limit: Optional[int] = None,
+                                 stats: Optional[SolveStats] = None) -> Optional[list[int]]:
+    """
+    BFS over packed integer states held in a CompactStateStore, whose insertion order doubles as the queue
+    @raise SearchMemoryExceeded: if the store would grow beyond memory_limit bytes
+    """
+    store = CompactStateStore(memory_limit)
+    store.add(start)
+    if is_goal(start):
+        return [start]
+    level_start, level_end = 0, 1
+    depth = 0
+
+    while level_start < level_end and depth < max_depth:
+        depth += 1
+        if stats is not None:
+            stats.start_level()
+        for index in range(level_start, level_end):
+            for child in get_children(store.states[index]):
+                child_index = store.add(child, index)
+                if child_index != -1 and is_goal(child):
+                    if stats is not None:
+                        stats.end_level(depth, len(store) - level_end, len(store))
+                    return store.trace(child_index)
+        level_start, level_end = level_end, len(store)
+        if stats is not None:
+            stats.end_level(depth, level_end - level_start, len(store))
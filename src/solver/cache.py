@@ -0,0 +1,128 @@
+import os
+from collections import OrderedDict
+from typing import Optional
+
+Move = tuple[int, int]
+
+PUT_RECORD = "P"
+DELETE_RECORD = "D"
+
+
+def encode_moves(moves: list[Move]) -> str:
+    return ",".join(f"{vehicle_id}:{delta}" for vehicle_id, delta in moves)
+
+
+def decode_moves(text: str) -> list[Move]:
+    if not text:
+        return []
+    moves = []
+    for move in text.split(","):
+        fields = move.split(":")
+        if len(fields) != 2:
+            raise ValueError(f"Malformed move {move!r}")
+        moves.append((int(fields[0]), int(fields[1])))
+    return moves
+
+
+class SolutionCache:
+    """
+    Persistent cache of optimal solutions, kept in memory as an LRU dict and backed by an append-only file.
+    Each line of the file is a put or delete record, the file is compacted once it holds too many stale records.
+    """
+    path: str
+    max_entries: int
+    entries: OrderedDict[str, list[Move]]
+
+    def __init__(self, path: str, max_entries=100000):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.records = 0
+        if os.path.exists(path) and self.load():
+            self.truncate_partial_line()
+        self.file = open(path, "a", encoding="utf-8")
+
+    def load(self) -> bool:
+        """
+        @return: True if the file ends with a partially written line
+        """
+        partial_line = False
+        with open(self.path, encoding="utf-8") as file:
+            for line in file:
+                # Ignore a partially written last line, a cut moves field would otherwise load as a shorter solution
+                if not line.endswith("\n"):
+                    partial_line = True
+                    break
+                record = line[:-1].split("\t")
+                if record[0] == PUT_RECORD and len(record) == 3:
+                    try:
+                        moves = decode_moves(record[2])
+                    except ValueError:
+                        continue
+                    self.entries[record[1]] = moves
+                    self.entries.move_to_end(record[1])
+                elif record[0] == DELETE_RECORD and len(record) == 2:
+                    self.entries.pop(record[1], None)
+                else:
+                    continue
+                self.records += 1
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return partial_line
+
+    def truncate_partial_line(self):
+        """
+        Cut the partially written last line, the next record would otherwise be appended to it
+        """
+        with open(self.path, "rb+") as file:
+            data = file.read()
+            file.truncate(data.rfind(b"\n") + 1)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key: str):
+        return key in self.entries
+
+    def get(self, key: str) -> Optional[list[Move]]:
+        moves = self.entries.get(key)
+        if moves is not None:
+            self.entries.move_to_end(key)
+        return moves
+
+    def put(self, key: str, moves: list[Move]):
+        self.entries[key] = list(moves)
+        self.entries.move_to_end(key)
+        self.write_record(PUT_RECORD, key, encode_moves(moves))
+        while len(self.entries) > self.max_entries:
+            evicted_key, _ = self.entries.popitem(last=False)
+            self.write_record(DELETE_RECORD, evicted_key)
+        if self.records > 2 * max(self.max_entries, len(self.entries)):
+            self.compact()
+
+    def write_record(self, *fields: str):
+        self.file.write("\t".join(fields) + "\n")
+        self.file.flush()
+        self.records += 1
+
+    def compact(self):
+        """
+        Rewrite the file with only the live entries, in LRU order
+        """
+        self.file.close()
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            for key, moves in self.entries.items():
+                file.write(f"{PUT_RECORD}\t{key}\t{encode_moves(moves)}\n")
+        os.replace(temp_path, self.path)
+        self.records = len(self.entries)
+        self.file = open(self.path, "a", encoding="utf-8")
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
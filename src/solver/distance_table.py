@@ -0,0 +1,84 @@
+from array import array
+from typing import Optional
+from src.models.bitboard import BitBoard, BitState
+from .store import CompactStateStore
+
+UNREACHABLE = 255
+
+
+class DistanceTable:
+    """
+    Distance to the closest solved state for every state in the connected component of a board.
+    States live in a CompactStateStore and distances in a parallel byte array, so lookups are O(1).
+    """
+    layout: BitBoard
+    slide: bool
+    store: CompactStateStore
+    distances: array
+
+    def __init__(self, layout: BitBoard, store: CompactStateStore, distances: array, slide: bool):
+        self.layout = layout
+        self.store = store
+        self.distances = distances
+        self.slide = slide
+
+    @staticmethod
+    def build(layout: BitBoard, state: BitState, slide=False) -> "DistanceTable":
+        # Every move can be undone, so the component is also the set of states that can reach its solved states
+        store = CompactStateStore()
+        store.add(layout.pack(state))
+        index = 0
+        while index < len(store):
+            for child in layout.get_child_states(layout.unpack(store.states[index])):
+                store.add(layout.pack(child))
+            index += 1
+
+        table = DistanceTable(layout, store, array('B', [UNREACHABLE]) * len(store), slide)
+        frontier = [index for index, key in enumerate(store.states) if layout.is_complete(layout.unpack(key))]
+        for index in frontier:
+            table.distances[index] = 0
+        distance = 0
+        while frontier:
+            distance += 1
+            next_frontier = []
+            for index in frontier:
+                for child in table.get_child_states(layout.unpack(store.states[index])):
+                    child_index = store.find(layout.pack(child))
+                    if table.distances[child_index] == UNREACHABLE:
+                        table.distances[child_index] = distance
+                        next_frontier.append(child_index)
+            frontier = next_frontier
+        return table
+
+    def __len__(self):
+        return len(self.store)
+
+    def get_child_states(self, state: BitState):
+        return self.layout.get_slide_child_states(state) if self.slide else self.layout.get_child_states(state)
+
+    def distance(self, state: BitState) -> Optional[int]:
+        """
+        @return: number of moves to the closest solved state, or None if the state can not be solved
+        """
+        index = self.store.find(self.layout.pack(state))
+        if index == -1:
+            raise KeyError("State is not part of the table's component")
+        distance = self.distances[index]
+        return None if distance == UNREACHABLE else distance
+
+    def best_move(self, state: BitState) -> Optional[BitState]:
+        """
+        @return: a child on an optimal path to a solved state, None if the state is solved or can not be solved
+        """
+        distance = self.distance(state)
+        if not distance:
+            return None
+        return next(child for child in self.get_child_states(state) if self.distance(child) == distance - 1)
+
+    def path(self, state: BitState) -> Optional[list[BitState]]:
+        if self.distance(state) is None:
+            return None
+        path = [state]
+        while (state := self.best_move(state)) is not None:
+            path.append(state)
+        return path
@@ -0,0 +1,47 @@
+from src.models.bitboard import BitBoard, BitState, LAST_COL_MASK
+from src.models.consts import BOARD_SIZE
+from src.models.vehicle import VehicleOrientation
+
+RED_CAR_ROW_MASKS = tuple(((1 << BOARD_SIZE) - 1) << (row * BOARD_SIZE) for row in range(BOARD_SIZE))
+
+
+def zero_heuristic(layout: BitBoard, state: BitState) -> int:
+    """
+    Makes A* expand states in BFS order, a baseline for checking the other heuristics
+    """
+    return 0
+
+
+def red_car_front_mask(state: BitState) -> int:
+    red_car_mask = state[0]
+    row_mask = RED_CAR_ROW_MASKS[(red_car_mask.bit_length() - 1) // BOARD_SIZE]
+    # Every slot of the row that is to the right of the red car
+    return row_mask & ~((1 << red_car_mask.bit_length()) - 1)
+
+
+def blocking_vehicles(state: BitState) -> int:
+    front_mask = red_car_front_mask(state)
+    return sum(1 for mask in state[1:] if mask & front_mask)
+
+
+def red_car_distance(state: BitState) -> int:
+    return BOARD_SIZE - 1 - (state[0].bit_length() - 1) % BOARD_SIZE
+
+
+def blocking_heuristic(layout: BitBoard, state: BitState) -> int:
+    """
+    Distance of the red car to the exit plus the number of vehicles blocking its row.
+    Every one of those slots and vehicles needs at least one distinct step, so it never overestimates.
+    """
+    if not state or layout.orientations[0] != VehicleOrientation.HORIZONTAL or state[0] & LAST_COL_MASK:
+        return 0
+    return red_car_distance(state) + blocking_vehicles(state)
+
+
+def slide_blocking_heuristic(layout: BitBoard, state: BitState) -> int:
+    """
+    Slide metric version of blocking_heuristic, the red car can cover its whole distance in a single move
+    """
+    if not state or layout.orientations[0] != VehicleOrientation.HORIZONTAL or state[0] & LAST_COL_MASK:
+        return 0
+    return 1 + blocking_vehicles(state)
@@ -0,0 +1,90 @@
+import heapq
+from collections.abc import Callable, Hashable, Iterable
+from itertools import count
+from typing import Optional
+from .bfs import trace_path
+
+
+def a_star_search(start: Hashable,
+                  get_children: Callable[[Hashable], Iterable[Hashable]],
+                  is_goal: Callable[[Hashable], bool],
+                  heuristic: Callable[[Hashable], int],
+                  max_depth=93) -> Optional[list]:
+    """
+    A* with unit move costs, optimal as long as the heuristic never overestimates.
+    States are reopened when a cheaper path is found, so the heuristic does not have to be consistent.
+    """
+    tie_breaker = count()
+    parents = {start: None}
+    costs = {start: 0}
+    # Among equal f prefer deeper states, they are closer to a goal
+    open_heap = [(heuristic(start), 0, next(tie_breaker), start)]
+
+    while open_heap:
+        _, negative_cost, _, state = heapq.heappop(open_heap)
+        cost = -negative_cost
+        if cost > costs[state]:
+            continue
+        if is_goal(state):
+            return trace_path(parents, state)
+        child_cost = cost + 1
+        for child in get_children(state):
+            if child_cost < costs.get(child, max_depth + 1):
+                estimate = child_cost + heuristic(child)
+                if estimate <= max_depth:
+                    costs[child] = child_cost
+                    parents[child] = state
+                    heapq.heappush(open_heap, (estimate, -child_cost, next(tie_breaker), child))
+
+
+def ida_star_search(start: Hashable,
+                    get_children: Callable[[Hashable], Iterable[Hashable]],
+                    is_goal: Callable[[Hashable], bool],
+                    heuristic: Callable[[Hashable], int],
+                    max_depth=93,
+                    transposition_limit=1 << 20,
+                    key: Optional[Callable[[Hashable], Hashable]] = None) -> Optional[list]:
+    """
+    Iterative deepening A*. Besides the current path it only keeps a transposition table of at most
+    transposition_limit states per iteration, so memory stays flat however large the state space is.
+    @param key: compact form of a state for the transposition table, the state itself by default
+    """
+    path = [start]
+    on_path = {start}
+    transpositions = {}
+
+    def search(cost, threshold):
+        state = path[-1]
+        estimate = cost + heuristic(state)
+        if estimate > threshold:
+            return estimate
+        if is_goal(state):
+            return True
+        # Already expanded with this threshold through a path that was not longer
+        state_key = key(state) if key is not None else state
+        if transpositions.get(state_key, cost + 1) <= cost:
+            return None
+        if state_key in transpositions or len(transpositions) < transposition_limit:
+            transpositions[state_key] = cost
+        next_threshold = None
+        for child in get_children(state):
+            if child in on_path:
+                continue
+            path.append(child)
+            on_path.add(child)
+            result = search(cost + 1, threshold)
+            if result is True:
+                return True
+            path.pop()
+            on_path.remove(child)
+            if result is not None and (next_threshold is None or result < next_threshold):
+                next_threshold = result
+        return next_threshold
+
+    threshold = heuristic(start)
+    while threshold is not None and threshold <= max_depth:
+        transpositions.clear()
+        result = search(0, threshold)
+        if result is True:
+            return path
+        threshold = result
@@ -0,0 +1,204 @@
+import atexit
+import multiprocessing
+from array import array
+from typing import Optional
+from src.models.bitboard import BitBoard
+from .store import HASH_MULTIPLIER, UINT64_MASK
+
+SEARCH_COMMAND = "search"
+EXPAND_COMMAND = "expand"
+PARENT_COMMAND = "parent"
+RESET_COMMAND = "reset"
+STOP_COMMAND = "stop"
+# Seconds between the checks that every worker is still alive while waiting for a reply
+WORKER_POLL_INTERVAL = 0.5
+
+
+class BrokenSearchPoolError(RuntimeError):
+    pass
+
+
+def state_owner(key: int, workers: int) -> int:
+    return (((key * HASH_MULTIPLIER) & UINT64_MASK) >> 32) % workers
+
+
+def partition_worker(worker_index: int, workers: int, connection, inboxes: list):
+    """
+    Owns the visited states whose hash maps to worker_index. On every level it expands its own frontier,
+    sends each child to the worker that owns it and deduplicates the children it received. The process serves
+    one search after the other until it is stopped.
+    """
+    layout = None
+    slide = False
+    parents = {}
+    frontier = []
+
+    while True:
+        command, argument = connection.recv()
+        if command == STOP_COMMAND:
+            break
+        if command == SEARCH_COMMAND:
+            layout, slide, start = argument
+            parents = {start: None} if state_owner(start, workers) == worker_index else {}
+            frontier = list(parents)
+            continue
+        if command == RESET_COMMAND:
+            parents = {}
+            frontier = []
+            continue
+        if command == PARENT_COMMAND:
+            connection.send(parents[argument])
+            continue
+
+        # Children are deduplicated before they are sent: within the level, against this worker's own visited
+        # states, and the move back to the parent a state was reached from is never sent at all
+        buckets = [{} for _ in range(workers)]
+        goal = None
+        for key in frontier:
+            parent_key = parents[key]
+            for child_key in layout.get_child_keys(key, slide):
+                if child_key == parent_key:
+                    continue
+                # A complete child was not visited on an earlier level, or the search would have stopped there,
+                # so it can be reported before its owner has seen it
+                if goal is None and layout.is_complete_key(child_key):
+                    goal = child_key
+                owner = state_owner(child_key, workers)
+                if owner == worker_index and child_key in parents:
+                    continue
+                buckets[owner].setdefault(child_key, key)
+        for owner, bucket in enumerate(buckets):
+            if owner != worker_index:
+                inboxes[owner].put((array('Q', bucket.keys()), array('Q', bucket.values())))
+        received = [(buckets[worker_index].keys(), buckets[worker_index].values())]
+        received += [inboxes[worker_index].get() for _ in range(workers - 1)]
+
+        frontier = []
+        for child_keys, parent_keys in received:
+            for child_key, parent_key in zip(child_keys, parent_keys):
+                if child_key not in parents:
+                    parents[child_key] = parent_key
+                    frontier.append(child_key)
+        connection.send((goal, len(frontier)))
+
+
+class ParallelSearchPool:
+    """
+    Partition worker processes that stay alive between searches, so a solve does not pay for starting them
+    """
+    workers: int
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.inboxes = [multiprocessing.Queue() for _ in range(workers)]
+        self.connections = []
+        self.processes = []
+        for worker_index in range(workers):
+            connection, worker_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=partition_worker,
+                args=(worker_index, workers, worker_connection, self.inboxes),
+                daemon=True
+            )
+            process.start()
+            # Only the worker holds its end, so recv raises EOFError instead of blocking once the worker is gone
+            worker_connection.close()
+            self.connections.append(connection)
+            self.processes.append(process)
+
+    def is_alive(self) -> bool:
+        return all(process.is_alive() for process in self.processes)
+
+    def broadcast(self, command: str, argument=None):
+        try:
+            for connection in self.connections:
+                connection.send((command, argument))
+        except OSError as error:
+            raise BrokenSearchPoolError("A parallel search worker process died") from error
+
+    def receive(self, connection):
+        """
+        @raise BrokenSearchPoolError: if a worker died, the others may be waiting for its children forever
+        """
+        try:
+            while not connection.poll(WORKER_POLL_INTERVAL):
+                if not self.is_alive():
+                    raise BrokenSearchPoolError("A parallel search worker process died")
+            return connection.recv()
+        except (EOFError, OSError) as error:
+            raise BrokenSearchPoolError("A parallel search worker process died") from error
+
+    def search(self, layout: BitBoard, start: int, slide=False, max_depth=93) -> Optional[list[int]]:
+        self.broadcast(SEARCH_COMMAND, (layout, slide, start))
+        path = self.expand_levels(max_depth)
+        # Free the visited states, the processes wait for the next search
+        self.broadcast(RESET_COMMAND)
+        return path
+
+    def expand_levels(self, max_depth: int) -> Optional[list[int]]:
+        for depth in range(1, max_depth + 1):
+            self.broadcast(EXPAND_COMMAND)
+            replies = [self.receive(connection) for connection in self.connections]
+            goal = next((goal for goal, _ in replies if goal is not None), None)
+            if goal is not None:
+                path = [goal]
+                while len(path) <= depth:
+                    connection = self.connections[state_owner(path[-1], self.workers)]
+                    connection.send((PARENT_COMMAND, path[-1]))
+                    path.append(self.receive(connection))
+                path.reverse()
+                return path
+            if not any(frontier_size for _, frontier_size in replies):
+                return None
+        return None
+
+    def close(self):
+        for connection in self.connections:
+            try:
+                connection.send((STOP_COMMAND, None))
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self.processes:
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+
+
+pools: dict[int, ParallelSearchPool] = {}
+
+
+def get_pool(workers: int) -> ParallelSearchPool:
+    pool = pools.get(workers)
+    if pool is None or not pool.is_alive():
+        if pool is not None:
+            pool.close()
+        pool = pools[workers] = ParallelSearchPool(workers)
+    return pool
+
+
+@atexit.register
+def close_pools():
+    for pool in pools.values():
+        pool.close()
+    pools.clear()
+
+
+def parallel_breadth_first_search(layout: BitBoard, start: int, slide=False, max_depth=93,
+                                  workers: Optional[int] = None) -> Optional[list[int]]:
+    """
+    Level synchronous BFS over packed states, every depth level is expanded by all worker processes together.
+    The visited set is partitioned by state hash, so each state has exactly one owner and no locking is needed.
+    The processes of every worker count are started once and reused by later searches.
+    """
+    if layout.is_complete(layout.unpack(start)):
+        return [start]
+    workers = workers or multiprocessing.cpu_count()
+    pool = get_pool(workers)
+    try:
+        return pool.search(layout, start, slide, max_depth)
+    except BaseException:
+        # An interrupted search leaves messages in flight and a failed one lost a worker, the next search
+        # starts a new pool
+        pools.pop(workers, None)
+        pool.close()
+        raise
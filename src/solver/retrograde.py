@@ -0,0 +1,133 @@
+import random
+from collections import Counter
+from collections.abc import Iterator
+from dataclasses import dataclass
+from itertools import combinations_with_replacement
+from src.models.bitboard import BitBoard, BitState
+from src.models.consts import BOARD_SIZE
+from src.models.vehicle import Vehicle, VehicleOrientation
+from .distance_table import DistanceTable
+
+RED_CAR_ID = 1
+RED_CAR_ROW = 2
+CAR_SIZE = 2
+TRUCK_SIZE = 3
+# The physical set has cars 2-12 and trucks 13-16, generated boards only use vehicles that exist
+CAR_IDS = tuple(range(2, 13))
+TRUCK_IDS = tuple(range(13, 17))
+
+# A piece is a vehicle without a position: (orientation, row or column of its line, size)
+Piece = tuple[VehicleOrientation, int, int]
+PIECES: tuple[Piece, ...] = tuple(
+    (orientation, line, size)
+    for orientation in (VehicleOrientation.HORIZONTAL, VehicleOrientation.VERTICAL)
+    for line in range(BOARD_SIZE)
+    for size in (CAR_SIZE, TRUCK_SIZE)
+)
+RED_CAR_PIECE: Piece = (VehicleOrientation.HORIZONTAL, RED_CAR_ROW, CAR_SIZE)
+
+
+@dataclass(frozen=True)
+class GeneratedPuzzle:
+    layout: BitBoard
+    state: BitState
+    solution_length: int
+    component_size: int
+
+
+def is_valid_pieces(pieces: tuple[Piece, ...]) -> bool:
+    """
+    @return: True if the pieces fit the physical set and every line has room for its pieces
+    """
+    sizes = Counter(size for _, _, size in pieces)
+    if sizes[CAR_SIZE] > len(CAR_IDS) or sizes[TRUCK_SIZE] > len(TRUCK_IDS):
+        return False
+    line_lengths = Counter()
+    for orientation, line, size in (RED_CAR_PIECE, *pieces):
+        line_lengths[orientation, line] += size
+    return max(line_lengths.values()) <= BOARD_SIZE
+
+
+def enumerate_layouts(vehicle_count: int) -> Iterator[tuple[Piece, ...]]:
+    """
+    Every multiset of pieces that fits the set, in a fixed order, the red car is implied
+    """
+    for pieces in combinations_with_replacement(PIECES, vehicle_count - 1):
+        if is_valid_pieces(pieces):
+            yield pieces
+
+
+def sample_layouts(vehicle_count: int, seed=None) -> Iterator[tuple[Piece, ...]]:
+    """
+    Random distinct multisets of pieces that fit the set, endless unless the layout space runs out
+    """
+    rng = random.Random(seed)
+    seen = set()
+    attempts = 0
+    while attempts < 1000:
+        pieces = tuple(sorted(rng.choices(PIECES, k=vehicle_count - 1), key=PIECES.index))
+        if pieces in seen or not is_valid_pieces(pieces):
+            attempts += 1
+            continue
+        attempts = 0
+        seen.add(pieces)
+        yield pieces
+
+
+def pieces_layout(pieces: tuple[Piece, ...]) -> BitBoard:
+    car_ids, truck_ids = iter(CAR_IDS), iter(TRUCK_IDS)
+    vehicles = [Vehicle(id=RED_CAR_ID, slots=((RED_CAR_ROW, 0), (RED_CAR_ROW, 1)),
+                        orientation=VehicleOrientation.HORIZONTAL)]
+    for orientation, line, size in pieces:
+        vehicle_id = next(car_ids) if size == CAR_SIZE else next(truck_ids)
+        if orientation == VehicleOrientation.HORIZONTAL:
+            slots = tuple((line, offset) for offset in range(size))
+        else:
+            slots = tuple((offset, line) for offset in range(size))
+        vehicles.append(Vehicle(id=vehicle_id, slots=slots, orientation=orientation))
+    layout, _ = BitBoard.from_vehicles(tuple(vehicles))
+    return layout
+
+
+def solved_states(layout: BitBoard) -> Iterator[BitState]:
+    """
+    Every placement of the vehicles without overlaps that has the red car at the exit. Identical pieces on one
+    line only differ by their ids, and they can never pass each other, so they are placed in increasing offset
+    order and each puzzle comes up once instead of once per labeling.
+    """
+    position_masks = layout.position_masks
+    state = [position_masks[0][-1]]
+
+    def place(vehicle_index, occupied, previous_offset):
+        if vehicle_index == len(position_masks):
+            yield tuple(state)
+            return
+        masks = position_masks[vehicle_index]
+        first_offset = previous_offset + 1 if vehicle_index > 1 and masks == position_masks[vehicle_index - 1] else 0
+        for offset in range(first_offset, len(masks)):
+            mask = masks[offset]
+            if not mask & occupied:
+                state.append(mask)
+                yield from place(vehicle_index + 1, occupied | mask, offset)
+                state.pop()
+
+    yield from place(1, state[0], -1)
+
+
+def hardest_puzzles(layout: BitBoard, slide=False, min_moves=1) -> list[GeneratedPuzzle]:
+    """
+    Runs a reverse BFS from the solved states of every component of the layout and keeps the farthest state
+    of each component, as long as it needs at least min_moves moves
+    """
+    puzzles = []
+    visited = set()
+    for solved_state in solved_states(layout):
+        if layout.pack(solved_state) in visited:
+            continue
+        table = DistanceTable.build(layout, solved_state, slide)
+        visited.update(table.store.states)
+        solution_length = max(table.distances)
+        if solution_length >= min_moves:
+            key = table.store.states[table.distances.index(solution_length)]
+            puzzles.append(GeneratedPuzzle(layout, layout.unpack(key), solution_length, len(table)))
+    return puzzles
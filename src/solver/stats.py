@@ -0,0 +1,79 @@
+from dataclasses import dataclass, field
+from collections.abc import Callable, Iterable
+from time import perf_counter
+from typing import Optional
+
+
+@dataclass
+class DepthStats:
+    depth: int
+    nodes_expanded: int
+    frontier_size: int
+    visited_size: int
+    time: float
+
+
+@dataclass
+class SolveStats:
+    """
+    Search statistics, filled in only when passed to the solver so a disabled hook costs nothing.
+    Hashing time is whatever a level spends outside move generation and goal checks, mostly visited set lookups.
+    """
+    nodes_expanded: int = 0
+    move_generation_time: float = 0.0
+    goal_check_time: float = 0.0
+    hashing_time: float = 0.0
+    solution_depth: Optional[int] = None
+    depths: list[DepthStats] = field(default_factory=list)
+    on_depth: Optional[Callable[[DepthStats], None]] = None
+    level_start: tuple[float, int, float] = field(default=(0.0, 0, 0.0), repr=False)
+
+    def instrument(self, get_children: Callable[[object], Iterable], is_goal: Callable[[object], bool]):
+        """
+        @return: get_children and is_goal wrapped to count expansions and time themselves
+        """
+        def instrumented_get_children(state):
+            start_time = perf_counter()
+            children = list(get_children(state))
+            self.move_generation_time += perf_counter() - start_time
+            self.nodes_expanded += 1
+            return children
+
+        def instrumented_is_goal(state):
+            start_time = perf_counter()
+            result = is_goal(state)
+            self.goal_check_time += perf_counter() - start_time
+            return result
+
+        return instrumented_get_children, instrumented_is_goal
+
+    def start_level(self):
+        self.level_start = (perf_counter(), self.nodes_expanded, self.move_generation_time + self.goal_check_time)
+
+    def end_level(self, depth: int, frontier_size: int, visited_size: int):
+        start_time, start_nodes, start_measured_time = self.level_start
+        level_time = perf_counter() - start_time
+        measured_time = self.move_generation_time + self.goal_check_time - start_measured_time
+        self.hashing_time += max(level_time - measured_time, 0.0)
+        depth_stats = DepthStats(depth, self.nodes_expanded - start_nodes, frontier_size, visited_size, level_time)
+        self.depths.append(depth_stats)
+        if self.on_depth:
+            self.on_depth(depth_stats)
+
+    @property
+    def effective_branching_factor(self) -> Optional[float]:
+        """
+        The b for which a uniform tree as deep as the solution, or the search if none was found,
+        holds as many nodes as were expanded: nodes_expanded = b + b^2 + ... + b^depth
+        """
+        depth = self.solution_depth if self.solution_depth is not None else len(self.depths)
+        if not depth or not self.nodes_expanded:
+            return None
+        low, high = 0.0, float(self.nodes_expanded)
+        for _ in range(100):
+            branching_factor = (low + high) / 2
+            if sum(branching_factor ** level for level in range(1, depth + 1)) < self.nodes_expanded:
+                low = branching_factor
+            else:
+                high = branching_factor
+        return (low + high) / 2
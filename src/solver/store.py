@@ -0,0 +1,97 @@
+from array import array
+from typing import Optional
+
+HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+UINT64_MASK = (1 << 64) - 1
+NO_PARENT = -1
+
+
+class SearchMemoryExceeded(MemoryError):
+    pass
+
+
+class CompactStateStore:
+    """
+    Append-only table of packed states and their parent indices, deduplicated by an open addressing hash table.
+    States are stored in insertion order, so a BFS can use the table itself as its queue.
+    """
+    states: array
+    parents: array
+    table: array
+    memory_limit: Optional[int]
+
+    def __init__(self, memory_limit: Optional[int] = None, initial_table_bits=12):
+        self.memory_limit = memory_limit
+        self.states = array('Q')
+        self.parents = array('i')
+        self.table_bits = initial_table_bits
+        self.table = array('I', bytes(4 << initial_table_bits))
+        self.check_memory(0)
+
+    def __len__(self):
+        return len(self.states)
+
+    @property
+    def memory_usage(self) -> int:
+        return sum(len(arr) * arr.itemsize for arr in (self.states, self.parents, self.table))
+
+    def check_memory(self, extra_bytes):
+        if self.memory_limit is not None and self.memory_usage + extra_bytes > self.memory_limit:
+            raise SearchMemoryExceeded(
+                f"Search store needs more than {self.memory_limit} bytes after {len(self.states)} states")
+
+    def slot(self, key: int) -> int:
+        return ((key * HASH_MULTIPLIER) & UINT64_MASK) >> (64 - self.table_bits)
+
+    def find(self, key: int) -> int:
+        """
+        @return: index of the stored key, or -1 if it was never added
+        """
+        table, states = self.table, self.states
+        table_mask = len(table) - 1
+        slot = self.slot(key)
+        while table[slot]:
+            if states[table[slot] - 1] == key:
+                return table[slot] - 1
+            slot = (slot + 1) & table_mask
+        return -1
+
+    def add(self, key: int, parent_index=NO_PARENT) -> int:
+        """
+        @return: index of the newly stored key, or -1 if it is already stored
+        """
+        table, states = self.table, self.states
+        table_mask = len(table) - 1
+        slot = self.slot(key)
+        while table[slot]:
+            if states[table[slot] - 1] == key:
+                return -1
+            slot = (slot + 1) & table_mask
+
+        if self.memory_limit is not None:
+            self.check_memory(states.itemsize + self.parents.itemsize)
+        states.append(key)
+        self.parents.append(parent_index)
+        table[slot] = len(states)
+        if 2 * len(states) > len(table):
+            self.grow()
+        return len(states) - 1
+
+    def grow(self):
+        self.check_memory(len(self.table) * self.table.itemsize)
+        self.table_bits += 1
+        self.table = array('I', bytes(4 << self.table_bits))
+        table, table_mask = self.table, len(self.table) - 1
+        for index, key in enumerate(self.states, start=1):
+            slot = self.slot(key)
+            while table[slot]:
+                slot = (slot + 1) & table_mask
+            table[slot] = index
+
+    def trace(self, index: int) -> list[int]:
+        path = []
+        while index != NO_PARENT:
+            path.append(self.states[index])
+            index = self.parents[index]
+        path.reverse()
+        return path
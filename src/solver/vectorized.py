@@ -0,0 +1,125 @@
+from time import perf_counter
+from typing import Optional
+import numpy as np
+from src.models.bitboard import BitBoard, POSITION_BITS, POSITION_MASK
+from src.models.consts import BOARD_SIZE
+from src.models.vehicle import VehicleOrientation
+from .stats import SolveStats
+
+
+class FrontierTables:
+    """
+    Per vehicle lookup tables for expanding a whole frontier of packed states at once.
+    A frontier is a 2D array with one row per state and one column per vehicle holding its offset along its line.
+    """
+    def __init__(self, layout: BitBoard):
+        self.vehicles = len(layout.ids)
+        self.max_positions = np.array([BOARD_SIZE - size for size in layout.sizes], dtype=np.int64)
+        position_count = BOARD_SIZE - min(layout.sizes, default=BOARD_SIZE) + 1
+        # Occupancy mask of every vehicle at every offset, positions past the edge stay empty
+        self.masks = np.zeros((self.vehicles, position_count), dtype=np.uint64)
+        for vehicle_index, (base_mask, shift) in enumerate(zip(layout.base_masks, layout.shifts)):
+            for position in range(self.max_positions[vehicle_index] + 1):
+                self.masks[vehicle_index, position] = base_mask << (position * shift)
+        self.shifts = np.arange(self.vehicles, dtype=np.uint64) * np.uint64(POSITION_BITS)
+        self.red_car_goal = self.vehicles > 0 and layout.ids[0] == 1 \
+            and layout.orientations[0] == VehicleOrientation.HORIZONTAL
+
+    def pack(self, positions: np.ndarray) -> np.ndarray:
+        return np.bitwise_or.reduce(positions.astype(np.uint64) << self.shifts, axis=1)
+
+    def unpack(self, keys: np.ndarray) -> np.ndarray:
+        return ((keys[:, None] >> self.shifts) & np.uint64(POSITION_MASK)).astype(np.int64)
+
+    def occupancy(self, positions: np.ndarray) -> np.ndarray:
+        return np.bitwise_or.reduce(self.masks[np.arange(self.vehicles), positions], axis=1)
+
+    def is_complete(self, positions: np.ndarray) -> np.ndarray:
+        if not self.red_car_goal:
+            return np.zeros(len(positions), dtype=bool)
+        return positions[:, 0] == self.max_positions[0]
+
+    def expand(self, positions: np.ndarray, slide: bool) -> tuple[np.ndarray, np.ndarray]:
+        """
+        @return: positions of all the children and the frontier row index of each child's parent
+        """
+        occupied = self.occupancy(positions)
+        rows = np.arange(len(positions))
+        children, parent_rows = [], []
+        for vehicle_index in range(self.vehicles):
+            vehicle_positions = positions[:, vehicle_index]
+            others = occupied & ~self.masks[vehicle_index, vehicle_positions]
+            for direction in (1, -1):
+                legal = np.ones(len(positions), dtype=bool)
+                distance = 1
+                while legal.any():
+                    moved = vehicle_positions + direction * distance
+                    legal &= (moved >= 0) & (moved <= self.max_positions[vehicle_index])
+                    legal &= (self.masks[vehicle_index, np.clip(moved, 0, self.max_positions[vehicle_index])] & others) == 0
+                    child_rows = rows[legal]
+                    if len(child_rows):
+                        child_positions = positions[child_rows]
+                        child_positions[:, vehicle_index] = moved[child_rows]
+                        children.append(child_positions)
+                        parent_rows.append(child_rows)
+                    if not slide:
+                        break
+                    distance += 1
+        if not children:
+            return np.empty((0, self.vehicles), dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(children), np.concatenate(parent_rows)
+
+
+def sorted_contains(sorted_keys: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    if not len(sorted_keys):
+        return np.zeros(len(keys), dtype=bool)
+    indices = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    return sorted_keys[indices] == keys
+
+
+def vectorized_breadth_first_search(layout: BitBoard, start: int, slide=False,
+                                    max_depth=93, stats: Optional[SolveStats] = None) -> Optional[list[int]]:
+    """
+    BFS that expands every depth level as a NumPy array. Children of a level are deduplicated with np.unique
+    and against a sorted array of visited keys, each level keeps its sorted keys and their parent keys.
+    """
+    tables = FrontierTables(layout)
+    keys = np.array([start], dtype=np.uint64)
+    positions = tables.unpack(keys)
+    visited = keys
+    levels = [(keys, np.array([start], dtype=np.uint64))]
+
+    for depth in range(max_depth + 1):
+        if stats is not None:
+            goal_check_start = perf_counter()
+            complete = tables.is_complete(positions)
+            stats.goal_check_time += perf_counter() - goal_check_start
+            if depth:
+                stats.end_level(depth, len(keys), len(visited))
+        else:
+            complete = tables.is_complete(positions)
+        if complete.any():
+            path = [int(keys[np.argmax(complete)])]
+            for level_keys, level_parents in reversed(levels[1:]):
+                path.append(int(level_parents[np.searchsorted(level_keys, np.uint64(path[-1]))]))
+            path.reverse()
+            return path
+        if depth == max_depth or not len(keys):
+            return None
+
+        if stats is not None:
+            stats.start_level()
+            stats.nodes_expanded += len(positions)
+            expand_start = perf_counter()
+            child_positions, parent_rows = tables.expand(positions, slide)
+            stats.move_generation_time += perf_counter() - expand_start
+        else:
+            child_positions, parent_rows = tables.expand(positions, slide)
+        child_keys = tables.pack(child_positions)
+        child_keys, first_indices = np.unique(child_keys, return_index=True)
+        is_new = ~sorted_contains(visited, child_keys)
+        keys = child_keys[is_new]
+        first_indices = first_indices[is_new]
+        positions = child_positions[first_indices]
+        levels.append((keys, levels[-1][0][parent_rows[first_indices]]))
+        visited = np.union1d(visited, keys)
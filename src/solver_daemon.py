@@ -0,0 +1,382 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import signal
+import socket
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional, Union
+
+import numpy as np
+
+from src.consts import VEHICLES, DAEMON_SOCKET_PATH, DAEMON_SOLUTION_CACHE_PATH, IMAGE_CACHE_PATH
+from src.image_process.image_cache import ImageCache, ProcessResult, detect_board
+from src.models.bitboard import BitBoard
+from src.models.board import Board, SolverEngine, MoveMetric
+from src.solver.cache import SolutionCache, Move
+
+LATENCY_WINDOW = 10000
+PERCENTILES = (50, 90, 99)
+RECENT_LAYOUTS = 256
+
+# Interned layouts are only weakly referenced, the worker keeps the most recently solved ones alive so their
+# position tables are reused by the next batches instead of being rebuilt
+recent_layouts: OrderedDict[int, BitBoard] = OrderedDict()
+
+
+def solve_boards(tasks: list[tuple[str, int, MoveMetric]]) -> list[Union[Optional[list[Move]], Exception]]:
+    """
+    Runs in a worker process that lives as long as the daemon, it keeps the RECENT_LAYOUTS last board layouts
+    @param tasks: Board.encode() of the board, max depth and move metric of every solve in the batch
+    @return: the solution moves of every board, None if it has no solution within its max depth, or the error
+    solving it raised, so one failing board does not fail the others of the batch
+    """
+    solutions = []
+    for encoding, max_depth, metric in tasks:
+        try:
+            board = Board.decode(encoding)
+            recent_layouts[id(board.layout)] = board.layout
+            recent_layouts.move_to_end(id(board.layout))
+            if len(recent_layouts) > RECENT_LAYOUTS:
+                recent_layouts.popitem(last=False)
+            solution = board.find_solution(max_depth, SolverEngine.BITBOARD, metric=metric)
+            solutions.append(list(solution.moves) if solution is not None else None)
+        except Exception as error:
+            solutions.append(error)
+    return solutions
+
+
+def percentile(sorted_values: list[float], percent: float) -> float:
+    # Nearest rank, so every reported latency is one that was actually measured
+    return sorted_values[max(0, math.ceil(percent / 100 * len(sorted_values)) - 1)]
+
+
+@dataclass
+class DaemonStats:
+    started: float = field(default_factory=time.monotonic)
+    requests: int = 0
+    errors: int = 0
+    cache_hits: int = 0
+    deduplicated: int = 0
+    solves: int = 0
+    batches: int = 0
+    image_cache_hits: int = 0
+    latencies: dict[str, deque] = field(default_factory=dict)
+
+    def add_latency(self, command: str, latency: float):
+        self.latencies.setdefault(command, deque(maxlen=LATENCY_WINDOW)).append(latency)
+
+    def to_dict(self) -> dict:
+        latencies = {}
+        for command, values in self.latencies.items():
+            values = sorted(values)
+            latencies[command] = {
+                "count": len(values),
+                "mean": sum(values) / len(values),
+                **{f"p{percent}": percentile(values, percent) for percent in PERCENTILES},
+                "max": values[-1]
+            }
+        return {
+            "uptime": time.monotonic() - self.started,
+            "requests": self.requests,
+            "errors": self.errors,
+            "cache_hits": self.cache_hits,
+            "deduplicated": self.deduplicated,
+            "solves": self.solves,
+            "batches": self.batches,
+            "mean_batch_size": self.solves / self.batches if self.batches else 0.0,
+            "image_cache_hits": self.image_cache_hits,
+            "latency": latencies
+        }
+
+
+@dataclass
+class SolveTask:
+    """
+    A board waiting for a worker, solved as its canonical encoding so the moves are keyed like the cache
+    """
+    encoding: str
+    cache_key: str
+    max_depth: int
+    metric: MoveMetric
+    future: asyncio.Future
+
+
+class SolverDaemon:
+    """
+    Solves boards for other local processes over a Unix domain socket. Every request and response is one line of
+    JSON, a connection may send several requests and responses carry the request's "id".
+    Requests:
+        {"command": "solve", "board": matrix or Board.encode() string, "metric": "step", "max_depth": 93}
+        {"command": "solve", "image": path of a board photo}
+        {"command": "stats"}
+    The solution cache and image cache stay in memory between requests. Boards that are not cached wait up to
+    batch_delay for other requests, identical boards in flight are solved once and the batch is split between the
+    workers of a process pool.
+    """
+    socket_path: str
+    solution_cache: SolutionCache
+    image_cache: Optional[ImageCache]
+    workers: int
+    batch_size: int
+    batch_delay: float
+    pyramid: bool
+    single_pass: bool
+    stats: DaemonStats
+    pending: dict[tuple, asyncio.Future]
+    chunk_tasks: set[asyncio.Task]
+
+    def __init__(self, socket_path: str, solution_cache: SolutionCache, image_cache: Optional[ImageCache] = None,
+                 workers: Optional[int] = None, batch_size=64, batch_delay=0.005, pyramid=False, single_pass=False):
+        """
+        @param batch_delay: seconds the first request of a batch waits for more requests
+        @param pyramid: BoardImage pyramid mode for image requests
+        @param single_pass: BoardImage single pass vehicle detection for image requests
+        """
+        self.socket_path = socket_path
+        self.solution_cache = solution_cache
+        self.image_cache = image_cache
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.pyramid = pyramid
+        self.single_pass = single_pass
+        self.stats = DaemonStats()
+        # Solves and image detections in flight, by cache key, so identical requests share one result
+        self.pending = {}
+        self.chunk_tasks = set()
+        self.queue = None
+        self.executor = None
+
+    async def serve(self):
+        self.queue = asyncio.Queue()
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        remove_stale_socket(self.socket_path)
+        server = await asyncio.start_unix_server(self.handle_client, path=self.socket_path)
+        batcher = asyncio.create_task(self.run_batches())
+        stopped = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signal_number, stopped.set)
+        try:
+            async with server:
+                await stopped.wait()
+        finally:
+            batcher.cancel()
+            self.executor.shutdown(cancel_futures=True)
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                if line.strip():
+                    # Requests of one connection run concurrently, so a pipelining client fills batches too
+                    task = asyncio.create_task(self.respond(line, writer))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.wait(tasks)
+        except (ConnectionError, ValueError):
+            # The client went away or sent a line over the stream limit
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, line: bytes, writer: asyncio.StreamWriter):
+        start_time = time.perf_counter()
+        self.stats.requests += 1
+        request_id = command = None
+        kind = "invalid"
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            command = request.get("command", "solve")
+            if command == "solve":
+                kind = "image" if "image" in request else "solve"
+            response = await self.handle_request(command, request)
+        except Exception as error:
+            # Bad requests, unreadable images and failed solves are reported to the client, the daemon keeps serving
+            self.stats.errors += 1
+            response = {"error": f"{type(error).__name__}: {error}"}
+        if command != "stats":
+            self.stats.add_latency(kind, time.perf_counter() - start_time)
+        if request_id is not None:
+            response = {"id": request_id, **response}
+        if writer.is_closing():
+            return
+        try:
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def handle_request(self, command: str, request: dict) -> dict:
+        if command == "stats":
+            return {**self.stats.to_dict(), "cached_solutions": len(self.solution_cache), "pending": len(self.pending)}
+        if command != "solve":
+            raise ValueError(f"Unknown command {command}")
+
+        response = {}
+        if "image" in request:
+            matrix = await self.detect(request["image"])
+            response["image"] = request["image"]
+        else:
+            board = request["board"]
+            matrix = Board.decode(board).to_matrix() if isinstance(board, str) else np.array(board, dtype=int)
+        board = Board.from_matrix(matrix)
+        metric = MoveMetric[request.get("metric", "step").upper()]
+        moves = await self.solve(board, int(request.get("max_depth", 93)), metric)
+        return {
+            **response,
+            "board": board.to_matrix().tolist(),
+            "solved": moves is not None,
+            "solution_length": len(moves) if moves is not None else None,
+            "moves": moves
+        }
+
+    async def solve(self, board: Board, max_depth: int, metric: MoveMetric) -> Optional[list[Move]]:
+        moves = board.get_cached_moves(self.solution_cache, metric, symmetry=True)
+        if moves is not None:
+            self.stats.cache_hits += 1
+            return moves if len(moves) <= max_depth else None
+
+        cache_key, canonical_ids = board.solution_cache_key(metric, symmetry=True)
+        future = self.pending.get(("solve", cache_key, max_depth))
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self.pending["solve", cache_key, max_depth] = future
+            encoding, _ = board.canonical_encoding()
+            self.queue.put_nowait(SolveTask(encoding, cache_key, max_depth, metric, future))
+        else:
+            self.stats.deduplicated += 1
+        # The future holds the moves with canonical ids and not the cache, which may have evicted them by now
+        moves = await asyncio.shield(future)
+        if moves is None:
+            return None
+        return [(canonical_ids[vehicle_id], delta) for vehicle_id, delta in moves]
+
+    async def run_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.batch_delay
+            while len(batch) < self.batch_size and (timeout := deadline - loop.time()) > 0:
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self.stats.batches += 1
+            self.stats.solves += len(batch)
+            # One executor call per worker and not per board, so the batch pays the process round trip once
+            for chunk in (batch[index::self.workers] for index in range(min(self.workers, len(batch)))):
+                task = asyncio.create_task(self.run_chunk(chunk))
+                self.chunk_tasks.add(task)
+                task.add_done_callback(self.chunk_tasks.discard)
+
+    async def run_chunk(self, chunk: list[SolveTask]):
+        tasks = [(task.encoding, task.max_depth, task.metric) for task in chunk]
+        try:
+            solutions = await asyncio.get_running_loop().run_in_executor(self.executor, solve_boards, tasks)
+        except Exception as error:
+            # The worker process itself failed, no board of the chunk has a result
+            solutions = [error] * len(chunk)
+        for task, moves in zip(chunk, solutions):
+            del self.pending["solve", task.cache_key, task.max_depth]
+            if isinstance(moves, Exception):
+                task.future.set_exception(moves)
+                continue
+            if moves is not None:
+                self.solution_cache.put(task.cache_key, moves)
+            task.future.set_result(moves)
+
+    async def detect(self, image_path: str) -> np.ndarray:
+        with open(image_path, "rb") as file:
+            image_data = file.read()
+        key = ImageCache.key(image_data, VEHICLES, self.pyramid, self.single_pass)
+        if self.image_cache is not None:
+            result = self.image_cache.get(key)
+            if result is not None:
+                self.stats.image_cache_hits += 1
+                return result.board_matrix
+
+        future = self.pending.get(("image", key))
+        if future is not None:
+            self.stats.deduplicated += 1
+            result = await asyncio.shield(future)
+            return result.board_matrix
+
+        future = asyncio.get_running_loop().create_future()
+        self.pending["image", key] = future
+        try:
+            result: ProcessResult = await asyncio.get_running_loop().run_in_executor(
+                self.executor, detect_board, image_data, VEHICLES, self.pyramid, self.single_pass)
+            if self.image_cache is not None:
+                self.image_cache.put(key, result)
+            future.set_result(result)
+        except Exception as error:
+            future.set_exception(error)
+            # Mark the error as retrieved, identical requests waiting on the future may not exist
+            future.exception()
+            raise ValueError(f"No board found in {image_path}") from error
+        finally:
+            del self.pending["image", key]
+        return result.board_matrix
+
+
+def remove_stale_socket(socket_path: str):
+    """
+    Removes the socket file of a daemon that did not shut down cleanly, fails if a daemon still listens on it
+    """
+    if not os.path.exists(socket_path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        try:
+            client.connect(socket_path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.remove(socket_path)
+            return
+    raise OSError(f"A daemon is already listening on {socket_path}")
+
+
+def send_request(request: dict, socket_path=DAEMON_SOCKET_PATH, timeout: Optional[float] = None) -> dict:
+    """
+    Blocking client for tools that are not asyncio based, one request per connection
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        client.connect(socket_path)
+        client.sendall(json.dumps(request).encode() + b"\n")
+        with client.makefile("rb") as file:
+            return json.loads(file.readline())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve Rush Hour solves over a Unix domain socket")
+    parser.add_argument("--socket", default=DAEMON_SOCKET_PATH)
+    parser.add_argument("--cache", default=DAEMON_SOLUTION_CACHE_PATH, help="persistent solution cache file")
+    parser.add_argument("--image-cache", default=IMAGE_CACHE_PATH, help="image cache directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--batch-delay", type=float, default=5, help="milliseconds a batch waits for requests")
+    parser.add_argument("--pyramid", action="store_true", help="detect boards in images with the pyramid mode")
+    parser.add_argument("--single-pass", action="store_true", help="detect vehicles with a single pass")
+    parser.add_argument("--stats", action="store_true", help="print the stats of the running daemon and exit")
+    args = parser.parse_args()
+
+    if args.stats:
+        print(json.dumps(send_request({"command": "stats"}, args.socket), indent=2))
+        return
+    with SolutionCache(args.cache) as solution_cache:
+        daemon = SolverDaemon(args.socket, solution_cache, ImageCache(args.image_cache), args.workers,
+                              args.batch_size, args.batch_delay / 1000, args.pyramid, args.single_pass)
+        asyncio.run(daemon.serve())
+
+
+if __name__ == '__main__':
+    main()
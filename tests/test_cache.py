@@ -0,0 +1,113 @@
+import numpy as np
+
+from src.models.board import Board, SolverEngine, MoveMetric
+from src.solver.cache import SolutionCache
+
+BOARD = "CCDDDE99B20E11B20E044077A88030AFFF30"
+MOVES = [(2, 1), (14, -1), (1, 1)]
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "solutions.cache")
+    with SolutionCache(path) as cache:
+        cache.put("STEP:a", MOVES)
+        cache.put("STEP:empty", [])
+    with SolutionCache(path) as cache:
+        assert cache.get("STEP:a") == MOVES
+        assert cache.get("STEP:empty") == []
+        assert cache.get("STEP:missing") is None
+
+
+def test_eviction_is_persisted(tmp_path):
+    path = str(tmp_path / "solutions.cache")
+    with SolutionCache(path, max_entries=2) as cache:
+        cache.put("a", MOVES)
+        cache.put("b", MOVES)
+        cache.get("a")
+        cache.put("c", MOVES)
+        assert "b" not in cache
+    with SolutionCache(path, max_entries=2) as cache:
+        assert sorted(cache.entries) == ["a", "c"]
+
+
+def test_compaction_keeps_entries(tmp_path):
+    path = str(tmp_path / "solutions.cache")
+    with SolutionCache(path, max_entries=3) as cache:
+        for index in range(20):
+            cache.put(str(index), [(1, index)])
+    with open(path, encoding="utf-8") as file:
+        assert len(file.readlines()) <= 2 * 3 + 2
+    with SolutionCache(path, max_entries=3) as cache:
+        assert [cache.get(str(index)) for index in range(17, 20)] == [[(1, 17)], [(1, 18)], [(1, 19)]]
+        assert len(cache) == 3
+
+
+def test_partial_last_line_is_dropped(tmp_path):
+    path = str(tmp_path / "solutions.cache")
+    with SolutionCache(path) as cache:
+        cache.put("a", MOVES)
+    with open(path, "a", encoding="utf-8") as file:
+        # A write cut in the middle of the moves field
+        file.write("P\tb\t2:1,14:-")
+    with SolutionCache(path) as cache:
+        assert cache.get("b") is None
+        cache.put("c", MOVES)
+    with SolutionCache(path) as cache:
+        assert cache.get("a") == MOVES
+        assert cache.get("b") is None
+        assert cache.get("c") == MOVES
+
+
+def test_malformed_records_are_skipped(tmp_path):
+    path = tmp_path / "solutions.cache"
+    path.write_text("P\ta\t1:1\nP\tb\t1:x\nP\tc\nX\td\t1:1\nP\te\t1:1:1\nD\ta\nP\tf\t1:2\n", encoding="utf-8")
+    with SolutionCache(str(path)) as cache:
+        assert sorted(cache.entries) == ["f"]
+        assert cache.get("f") == [(1, 2)]
+
+
+def test_find_solution_uses_cache(tmp_path):
+    path = str(tmp_path / "solutions.cache")
+    board = Board.decode(BOARD)
+    with SolutionCache(path) as cache:
+        solution = board.find_solution(engine=SolverEngine.BITBOARD, cache=cache)
+        assert len(cache) == 1
+    with SolutionCache(path) as cache:
+        cached_solution = board.find_solution(engine=SolverEngine.BITBOARD, cache=cache)
+        assert cached_solution.moves == solution.moves
+        assert board.find_solution(len(solution) - 1, engine=SolverEngine.BITBOARD, cache=cache) is None
+        # The metric is part of the key
+        assert board.get_cached_moves(cache, MoveMetric.SLIDE) is None
+
+
+def relabel(board: Board, vehicle_ids: dict[int, int]) -> Board:
+    matrix = board.to_matrix()
+    return Board.from_matrix(np.vectorize(lambda vehicle_id: vehicle_ids.get(vehicle_id, vehicle_id))(matrix))
+
+
+def test_canonical_encoding_ignores_vehicle_ids():
+    board = Board.decode(BOARD)
+    other_ids = sorted(vehicle.id for vehicle in board.vehicles if vehicle.id != 1)
+    relabeled = relabel(board, dict(zip(other_ids, reversed(other_ids))))
+    assert relabeled.encode() != board.encode()
+    assert relabeled.canonical_encoding()[0] == board.canonical_encoding()[0]
+    # The red car is never renumbered
+    red_car_swapped = relabel(board, {1: other_ids[0], other_ids[0]: 1})
+    assert red_car_swapped.canonical_encoding()[0] != board.canonical_encoding()[0]
+
+
+def test_symmetric_cache_maps_moves_to_vehicle_ids(tmp_path):
+    path = str(tmp_path / "solutions.cache")
+    board = Board.decode(BOARD)
+    other_ids = sorted(vehicle.id for vehicle in board.vehicles if vehicle.id != 1)
+    vehicle_ids = dict(zip(other_ids, other_ids[1:] + other_ids[:1]))
+    relabeled = relabel(board, vehicle_ids)
+    with SolutionCache(path) as cache:
+        solution = board.find_solution(engine=SolverEngine.BITBOARD, cache=cache, symmetry=True)
+    with SolutionCache(path) as cache:
+        cached_solution = relabeled.find_solution(engine=SolverEngine.BOARD, cache=cache, symmetry=True)
+    # The cached moves of the first board, with the relabeled board's ids
+    assert cached_solution.moves == tuple((vehicle_ids.get(vehicle_id, vehicle_id), delta)
+                                          for vehicle_id, delta in solution.moves)
+    *_, last_board = cached_solution.boards()
+    assert last_board.is_complete()
@@ -0,0 +1,56 @@
+import random
+from itertools import product
+from typing import Optional
+
+import pytest
+
+from src.image_process.placement import solve_placements
+
+BOARD_SIZE = 6
+
+
+def random_mask(rng: random.Random) -> Optional[int]:
+    size = rng.choice((2, 3))
+    row, col = rng.randrange(BOARD_SIZE), rng.randrange(BOARD_SIZE)
+    if rng.random() < 0.5:
+        if col + size > BOARD_SIZE:
+            return None
+        return sum(1 << (row * BOARD_SIZE + col + offset) for offset in range(size))
+    if row - size + 1 < 0:
+        return None
+    return sum(1 << ((row - offset) * BOARD_SIZE + col) for offset in range(size))
+
+
+def product_placements(candidate_masks: list[list[Optional[int]]], occupied: int) -> Optional[list[int]]:
+    """
+    The itertools.product loop find_vehicles ran before solve_placements: the first combination in product order
+    that places every vehicle on a free slot
+    """
+    for option in product(*(range(len(masks)) for masks in candidate_masks)):
+        board = occupied
+        for masks, candidate in zip(candidate_masks, option):
+            mask = masks[candidate]
+            if mask is None or mask & board:
+                break
+            board |= mask
+        else:
+            return list(option)
+    return None
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_same_placements_as_product_loop(seed):
+    rng = random.Random(seed)
+    candidate_masks = [[random_mask(rng) for _ in range(rng.randint(1, 4))] for _ in range(rng.randint(0, 7))]
+    occupied = 0
+    for _ in range(rng.randint(0, 3)):
+        occupied |= random_mask(rng) or 0
+    assert solve_placements(candidate_masks, occupied, time_limit=60) == \
+        product_placements(candidate_masks, occupied)
+
+
+def test_time_limit():
+    candidate_masks = [[1 << index, 1 << (index + 1)] for index in range(10)]
+    # A deadline that already passed gives up before the first placement
+    assert solve_placements(candidate_masks, 0, time_limit=-1) is None
+    assert solve_placements(candidate_masks, 0, time_limit=60) is not None
@@ -0,0 +1,95 @@
+import json
+import os
+
+import pytest
+
+from src.models.board import Board, Solution, SolverEngine, SearchAlgorithm, SearchStore, MoveMetric
+from src.solver.heuristics import zero_heuristic
+from src.solver.store import SearchMemoryExceeded
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), os.pardir, "benchmarks", "puzzles.json")
+with open(CORPUS_PATH, encoding="utf-8") as corpus_file:
+    PUZZLES = json.load(corpus_file)
+
+# IDA* takes tens of seconds on the longer puzzles, it is only run on these
+IDA_STAR_MAX_STEPS = 30
+
+BITBOARD = {"engine": SolverEngine.BITBOARD}
+# find_solution keyword arguments of every engine and algorithm, the metric is added by the tests
+CONFIGURATIONS = {
+    "bitboard-bfs": BITBOARD,
+    "bitboard-compact": {**BITBOARD, "store": SearchStore.COMPACT},
+    "bitboard-compact-memory-limit": {**BITBOARD, "store": SearchStore.COMPACT, "memory_limit": 1 << 30},
+    "bitboard-a-star": {**BITBOARD, "algorithm": SearchAlgorithm.A_STAR},
+    "bitboard-a-star-zero": {**BITBOARD, "algorithm": SearchAlgorithm.A_STAR, "heuristic": zero_heuristic},
+    "bitboard-ida-star": {**BITBOARD, "algorithm": SearchAlgorithm.IDA_STAR},
+    "bitboard-vectorized": {**BITBOARD, "vectorized": True},
+    "bitboard-parallel": {**BITBOARD, "workers": 2},
+}
+
+
+def expected_length(puzzle: dict, metric: MoveMetric) -> int:
+    return puzzle["slide_moves"] if metric == MoveMetric.SLIDE else puzzle["steps"]
+
+
+def assert_solves(solution: Solution, board: Board, length: int):
+    assert solution is not None
+    assert solution.start == board
+    assert len(solution) == length
+    *_, last_board = solution.boards()
+    assert last_board.is_complete()
+
+
+def puzzles_of(configuration: str) -> list[dict]:
+    if configuration == "bitboard-ida-star":
+        return [puzzle for puzzle in PUZZLES if puzzle["steps"] <= IDA_STAR_MAX_STEPS]
+    return PUZZLES
+
+
+@pytest.mark.parametrize("puzzle", PUZZLES, ids=lambda puzzle: puzzle["name"])
+def test_board_engine(puzzle):
+    board = Board.decode(puzzle["board"])
+    assert_solves(board.find_solution(engine=SolverEngine.BOARD), board, puzzle["steps"])
+
+
+@pytest.mark.parametrize("metric", list(MoveMetric), ids=lambda metric: metric.name.lower())
+@pytest.mark.parametrize("configuration, puzzle", [
+    pytest.param(configuration, puzzle, id=f"{configuration}-{puzzle['name']}")
+    for configuration in CONFIGURATIONS for puzzle in puzzles_of(configuration)
+])
+def test_bitboard_engine(configuration, puzzle, metric):
+    board = Board.decode(puzzle["board"])
+    solution = board.find_solution(metric=metric, **CONFIGURATIONS[configuration])
+    assert_solves(solution, board, expected_length(puzzle, metric))
+
+
+@pytest.mark.parametrize("metric", list(MoveMetric), ids=lambda metric: metric.name.lower())
+@pytest.mark.parametrize("configuration", list(CONFIGURATIONS))
+def test_max_depth_below_optimal(configuration, metric):
+    puzzle = next(puzzle for puzzle in PUZZLES if puzzle["name"] == "sample-6-8")
+    board = Board.decode(puzzle["board"])
+    max_depth = expected_length(puzzle, metric) - 1
+    assert board.find_solution(max_depth, metric=metric, **CONFIGURATIONS[configuration]) is None
+
+
+def test_solved_board():
+    board = Board.decode("000000000000000011000000000000000000")
+    for configuration in CONFIGURATIONS.values():
+        assert len(board.find_solution(**configuration)) == 0
+
+
+def test_compact_store_memory_limit():
+    board = Board.decode(PUZZLES[-1]["board"])
+    with pytest.raises(SearchMemoryExceeded):
+        board.find_solution(engine=SolverEngine.BITBOARD, store=SearchStore.COMPACT, memory_limit=1 << 16)
+
+
+@pytest.mark.parametrize("matrix", [
+    [[1, 1, 0]],
+    [[7, 0, 0, 0, 0, 0], [0] * 6, [1, 1, 0, 0, 0, 0], [0] * 6, [0] * 6, [0] * 6],
+    [[2, 2, 0, 0, 0, 0], [0, 2, 0, 0, 0, 0], [1, 1, 0, 0, 0, 0], [0] * 6, [0] * 6, [0] * 6],
+    [[2, 0, 2, 0, 0, 0], [0] * 6, [1, 1, 0, 0, 0, 0], [0] * 6, [0] * 6, [0] * 6],
+], ids=["shape", "single-slot", "bent", "gap"])
+def test_invalid_matrix(matrix):
+    with pytest.raises(ValueError):
+        Board.from_matrix(matrix)